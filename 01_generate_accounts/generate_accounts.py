@@ -2,22 +2,63 @@
 This script generates MultiversX accounts on the devnet and requests xEGLD
 from the faucet for funding each account.
 """
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed,
+    wait
+)
 from pathlib import Path
+from queue import Full, Queue
+from threading import Lock, Thread
+import json
+import os
+import random
 import subprocess
+import time
 
+from cryptography.hazmat.primitives import hashes, hmac
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from multiversx_sdk import (
-    Mnemonic, Address, AddressComputer, UserWallet
+    Mnemonic, Address, AddressComputer, ProxyNetworkProvider, UserWallet
+)
+# Keystore internals of multiversx-sdk 0.19, only used by encrypt_wallet
+# for a non default scrypt cost. Check them when upgrading the SDK.
+from multiversx_sdk.wallet.crypto import EncryptedData, Randomness
+from multiversx_sdk.wallet.crypto.constants import (
+    CIPHER_ALGORITHM_AES_128_CTR, ENCRYPTOR_VERSION,
+    KEY_DERIVATION_FUNCTION_SCRYPT
 )
+from multiversx_sdk.wallet.crypto.encrypted_data import KeyDerivationParams
+from multiversx_sdk.wallet.user_wallet import UserWalletKind
 
 
 CHAIN = "D"
 SHARDS = 3
-ACCOUNTS = 3
+ACCOUNTS = 3  # Number of accounts to generate in each shard
+WORKERS = os.cpu_count() or 1  # Number of processes searching for keys
+CANDIDATES_PER_TASK = 16  # Number of keys derived by each worker task
+# Scrypt cost of the wallet keystores (SDK default is 4096).
+# Lower values speed up test fleets at the expense of security.
+KDF_N = 4096
+SDK_KDF_N = 4096  # Scrypt cost of the SDK keystore encryptor
+WRITE_QUEUE_SIZE = 64  # Max number of encrypted accounts waiting to be saved
+WRITE_QUEUE_TIMEOUT = 1  # Seconds between checks of the writer while the queue is full
+FAUCET_CONCURRENCY = 4  # Max number of accounts funded at once
+FAUCET_MAX_RETRIES = 3  # Number of retries of a failed faucet request
+FAUCET_BACKOFF = 5  # Seconds before the first retry, doubled on each retry
+FAUCET_TIMEOUT = 300  # Seconds before a faucet request is abandoned
+FUNDING_TIMEOUT = 300  # Seconds to wait for the balance of a requested account
+FUNDING_POLL_INTERVAL = 5  # Seconds between balance checks
+GATEWAY = "https://devnet-gateway.multiversx.com"
+PROXY = ProxyNetworkProvider(GATEWAY)
+# The faucet page is opened in the browser for one account at a time
+FAUCET_LOCK = Lock()
 
 ROOT_PATH = Path(__file__).parent.parent
 PASSFILE_PATH = ROOT_PATH / "wallets_password.txt"
 ACC_JSON_PATH = ROOT_PATH / "_accounts/json"
 MNEMONIC_PATH = ROOT_PATH / "_accounts/mnemonic"
+FUNDING_STATE_FILE = ROOT_PATH / "_accounts/funding_state.json"
 
 
 def read_accounts_password():
@@ -30,40 +71,213 @@ def read_accounts_password():
         return f.read().strip()
 
 
-def generate_account_for_shard(target_shard: int):
+def derive_candidates(count: int):
     """
-    Generates a MultiversX wallet account for a specific shard.
-    Keeps generating accounts until one matching the target shard is found.
+    Derives a batch of candidate accounts without encrypting any keystore.
+    Runs inside a worker process of the account generation pool.
     Args:
-        target_shard (int): The target shard number for the account
+        count (int): The number of candidates to derive
     Returns:
-        tuple: (UserWallet, Mnemonic, Address) containing:
-            - wallet: The generated wallet object
-            - mnemonic: The mnemonic phrase object
-            - address: The wallet's address
+        list: A list of (mnemonic text, public key bytes, shard) tuples
     """
-    address_computer = AddressComputer()
-    password = read_accounts_password()
+    address_computer = AddressComputer(SHARDS)
+    candidates = []
+    for _ in range(count):
+        mnemonic = Mnemonic.generate()
+        public_key = mnemonic.derive_key().generate_public_key()
+        shard = address_computer.get_shard_of_address(
+            Address(public_key.buffer))
+        candidates.append((mnemonic.get_text(), public_key.buffer, shard))
+    return candidates
+
+
+def generate_accounts_for_shards(accounts_per_shard: int):
+    """
+    Generates accounts for all shards in a single pass.
+    Candidate keys are derived in parallel by a process pool and each one is
+    assigned to its shard while that shard still needs accounts.
+    Args:
+        accounts_per_shard (int): The target number of accounts per shard
+    Returns:
+        dict: Shard number mapped to a list of (Mnemonic, Address) tuples
+    """
+    accepted = {shard: [] for shard in range(SHARDS)}
+    missing = SHARDS * accounts_per_shard
+
+    with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+        pending = {executor.submit(derive_candidates, CANDIDATES_PER_TASK)
+                   for _ in range(WORKERS * 2)}
+        while missing > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for text, public_key, shard in future.result():
+                    shard_accounts = accepted.get(shard)
+                    if (shard_accounts is None
+                            or len(shard_accounts) >= accounts_per_shard):
+                        continue
+                    shard_accounts.append((Mnemonic(text), Address(public_key)))
+                    missing -= 1
+                if missing > 0:
+                    pending.add(executor.submit(
+                        derive_candidates, CANDIDATES_PER_TASK))
+        for future in pending:
+            future.cancel()
+
+    return accepted
+
+
+def encrypt_wallet(mnemonic_text: str, password: str, kdf_n: int):
+    """
+    Encrypts a mnemonic into a wallet keystore with a configurable scrypt cost.
+    The default cost goes through the public UserWallet API. Other costs
+    mirror the keystore encryptor of multiversx-sdk 0.19, which always
+    uses n=4096.
+    Args:
+        mnemonic_text (str): The mnemonic phrase to encrypt
+        password (str): The wallet password
+        kdf_n (int): The scrypt cost parameter
+    Returns:
+        UserWallet: The encrypted wallet
+    """
+    if kdf_n == SDK_KDF_N:
+        return UserWallet.from_mnemonic(mnemonic_text, password)
+
+    randomness = Randomness()
+    kdf_params = KeyDerivationParams(n=kdf_n, r=8, p=1, dklen=32)
+    kdf = Scrypt(salt=randomness.salt, length=kdf_params.dklen,
+                 n=kdf_params.n, r=kdf_params.r, p=kdf_params.p)
+    derived_key = kdf.derive(password.encode())
+
+    encryptor = Cipher(algorithms.AES(derived_key[0:16]),
+                       modes.CTR(randomness.iv)).encryptor()
+    ciphertext = encryptor.update(mnemonic_text.encode()) + \
+        encryptor.finalize()
+
+    h = hmac.HMAC(derived_key[16:32], hashes.SHA256())
+    h.update(ciphertext)
+
+    encrypted_data = EncryptedData(
+        id=randomness.id,
+        version=ENCRYPTOR_VERSION,
+        cipher=CIPHER_ALGORITHM_AES_128_CTR,
+        ciphertext=ciphertext.hex(),
+        iv=randomness.iv.hex(),
+        kdf=KEY_DERIVATION_FUNCTION_SCRYPT,
+        kdfparams=kdf_params,
+        salt=randomness.salt.hex(),
+        mac=h.finalize().hex()
+    )
+    return UserWallet(UserWalletKind.MNEMONIC.value, encrypted_data)
 
+
+def encrypt_account(account_filename: str, mnemonic_text: str,
+                    password: str, kdf_n: int):
+    """
+    Encrypts the wallet of an account.
+    Runs inside a worker process of the export pool.
+    Args:
+        account_filename (str): The file name of the account, without extension
+        mnemonic_text (str): The mnemonic phrase of the account
+        password (str): The wallet password
+        kdf_n (int): The scrypt cost parameter
+    Returns:
+        tuple: (account filename, wallet JSON, mnemonic text)
+    """
+    wallet = encrypt_wallet(mnemonic_text, password, kdf_n)
+    return account_filename, wallet.to_json(), mnemonic_text
+
+
+def write_account_files(write_queue: Queue, errors: list):
+    """
+    Saves the encrypted accounts taken from the queue until None is received.
+    Args:
+        write_queue (Queue): Queue of (account filename, wallet JSON,
+        mnemonic text) tuples
+        errors (list): Receives the error that stopped the writer, if any
+    """
+    try:
+        _write_account_files(write_queue)
+    except Exception as e:
+        errors.append(e)
+
+
+def _write_account_files(write_queue: Queue):
+    while (item := write_queue.get()) is not None:
+        account_filename, wallet_json, mnemonic_text = item
+
+        json_file = ACC_JSON_PATH / f"{account_filename}.json"
+        with open(json_file, "w", encoding="utf-8") as f:
+            f.write(wallet_json)
+
+        mnemonic_file = MNEMONIC_PATH / f"{account_filename}.mnemonic"
+        with open(mnemonic_file, "w", encoding="utf-8") as m:
+            m.write(mnemonic_text)
+        print(f"Account saved to: {json_file}")
+
+
+def put_account(write_queue: Queue, writer: Thread, errors: list, item):
+    """
+    Queues an item for the writer thread, waiting while the queue is full.
+    Args:
+        write_queue (Queue): The bounded queue of the writer
+        writer (Thread): The writer thread
+        errors (list): The error that stopped the writer, if any
+        item: The item to queue
+    Raises:
+        RuntimeError: If the writer thread stopped
+    """
     while True:
-        mnemonic = Mnemonic.generate()
-        wallet = UserWallet.from_mnemonic(mnemonic.get_text(), password)
-        secret_key = mnemonic.derive_key()
-        public_key = secret_key.generate_public_key()
-        address = Address(public_key.buffer)
+        try:
+            write_queue.put(item, timeout=WRITE_QUEUE_TIMEOUT)
+            return
+        except Full:
+            # A stopped writer never empties the queue
+            if not writer.is_alive():
+                raise RuntimeError("The account writer stopped") from (
+                    errors[0] if errors else None)
+
 
-        shard = address_computer.get_shard_of_address(address)
-        if shard == target_shard:
-            return wallet, mnemonic, address
+def export_accounts(accounts: list[tuple[str, Mnemonic]]):
+    """
+    Encrypts the account wallets across worker processes and streams
+    the finished wallet and mnemonic files to disk through a bounded queue.
+    Args:
+        accounts (list[tuple[str, Mnemonic]]):
+        A list of (account filename, mnemonic) tuples
+    """
+    password = read_accounts_password()
+    write_queue = Queue(maxsize=WRITE_QUEUE_SIZE)
+    errors = []
+    writer = Thread(target=write_account_files, args=(write_queue, errors))
+    writer.start()
+
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+            futures = [executor.submit(encrypt_account, account_filename,
+                                       mnemonic.get_text(), password, KDF_N)
+                       for account_filename, mnemonic in accounts]
+            for future in as_completed(futures):
+                put_account(write_queue, writer, errors, future.result())
+    finally:
+        if writer.is_alive():
+            put_account(write_queue, writer, errors, None)
+        writer.join()
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\nExported {len(accounts)} accounts in {elapsed:.2f}s "
+          f"({len(accounts) / elapsed:.1f} accounts/sec)")
 
 
 def create_accounts():
     """
     Creates multiple MultiversX wallet accounts distributed across shards.
-    For each shard and account:
-    - Generates a new wallet with matching shard
-    - Saves the wallet JSON file
-    - Saves the mnemonic phrase to a separate file
+    Generates the keys for all shards in one parallel pass, then
+    encrypts and saves for each account:
+    - The wallet JSON file
+    - The mnemonic phrase to a separate file
     Creates necessary directories if they don't exist.
     """
     if not ACC_JSON_PATH.exists():
@@ -71,63 +285,193 @@ def create_accounts():
     if not MNEMONIC_PATH.exists():
         MNEMONIC_PATH.mkdir(parents=True, exist_ok=True)
 
+    print(f"\nGenerating {ACCOUNTS} accounts for each of the {
+          SHARDS} shards using {WORKERS} workers...")
+    shard_accounts = generate_accounts_for_shards(ACCOUNTS)
+
     accounts = []
-    # Generate accounts in each shard
     for shard in range(SHARDS):
 
-        print(f"\nGenerating accounts for Shard {shard}:")
-        for acc in range(ACCOUNTS):
-            # Generate accounts
-            wallet, mnemonic, address = generate_account_for_shard(shard)
-            accounts.append(wallet)
+        print(f"\nAccounts for Shard {shard}:")
+        for acc, (mnemonic, address) in enumerate(shard_accounts[shard]):
+            print(f"Account {len(accounts) + 1}: {address.bech32()}")
+            account_filename = f"s{shard}_a{acc + 1}_{address.bech32()}"
+            accounts.append((account_filename, mnemonic))
 
-            print(f"\nAccount {len(accounts)} (Shard {shard}):")
-            print(f"Address: {address.bech32()}")
+    print(f"\nEncrypting and saving {len(accounts)} accounts...")
+    export_accounts(accounts)
+
+
+def load_funding_state():
+    """
+    Loads the funding state of the accounts from the state file.
+    Returns:
+        dict: Account file name mapped to its funding state
+    """
+    if not FUNDING_STATE_FILE.exists():
+        return {}
+    with open(FUNDING_STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-            # Save account files
-            account_filename = f"s{shard}_a{acc + 1}_{address.bech32()}"
 
-            # Save json files
-            json_file = ACC_JSON_PATH / f"{account_filename}.json"
-            wallet.save(json_file)
-            print(f"Account saved to: {json_file}")
+def save_funding_state(state: dict):
+    """
+    Saves the funding state of the accounts, replacing the state file
+    atomically so an interrupted run never leaves it half written.
+    Args:
+        state (dict): Account file name mapped to its funding state
+    """
+    temp_file = FUNDING_STATE_FILE.with_suffix(".tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+    os.replace(temp_file, FUNDING_STATE_FILE)
 
-            # Save mnemonic files
-            mnemonic_file = MNEMONIC_PATH / f"{account_filename}.mnemonic"
-            with open(mnemonic_file, "w", encoding="utf-8") as m:
-                m.write(mnemonic.get_text())
-            print(f"Mnemonic saved to: {mnemonic_file}")
+
+def get_account_address(json_file_path: Path):
+    """
+    Returns the address of an account from its file name,
+    in the format s{shard}_a{account}_{address}.json.
+    Args:
+        json_file_path (Path): The path of the account JSON file
+    Returns:
+        Address: The account address
+    """
+    return Address.new_from_bech32(json_file_path.stem.split("_")[-1])
+
+
+def is_funded(address: Address):
+    """
+    Checks if an account has an EGLD balance.
+    Args:
+        address (Address): The account address
+    Returns:
+        bool: True if the balance is positive, False otherwise or on error
+    """
+    try:
+        return PROXY.get_account(address).balance > 0
+    except Exception as e:
+        print(f"Error fetching the balance of {address.to_bech32()}: {str(e)}")
+        return False
+
+
+def wait_for_funding(address: Address, timeout: float):
+    """
+    Polls the balance of an account until it is funded.
+    Args:
+        address (Address): The account address
+        timeout (float): Seconds before giving up
+    Returns:
+        bool: True if the account was funded in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if is_funded(address):
+            return True
+        time.sleep(FUNDING_POLL_INTERVAL)
+    return is_funded(address)
+
+
+def request_faucet(json_file_path: Path):
+    """
+    Calls the faucet for an account and waits for its balance, retrying
+    with exponential backoff and jitter. The faucet is completed in the
+    browser, so it runs for one account at a time, while the balances of
+    the accounts already requested are polled concurrently.
+    Args:
+        json_file_path (Path): The path of the account JSON file
+    Returns:
+        tuple: (funded, attempts) where funded tells if the account has a balance
+    """
+    filename = json_file_path.name
+    address = get_account_address(json_file_path)
+    delay = FAUCET_BACKOFF
+    for attempt in range(1, FAUCET_MAX_RETRIES + 2):
+        with FAUCET_LOCK:
+            print(f"Execute faucet for account {filename} (attempt {attempt})")
+            try:
+                result = subprocess.run(["mxpy", "faucet", "request",
+                                         "--keyfile", str(json_file_path),
+                                         "--passfile", str(PASSFILE_PATH),
+                                         "--chain", CHAIN],
+                                        check=False, timeout=FAUCET_TIMEOUT)
+            except FileNotFoundError:
+                print("mxpy not found. Check mxpy installation")
+                return False, attempt
+            except subprocess.TimeoutExpired:
+                print(f"Faucet for account {filename} timed out")
+                result = None
+
+        # The balance is polled outside the lock, so the faucet of the
+        # next account can be requested meanwhile
+        if result is not None:
+            if result.returncode != 0:
+                print(f"Faucet for account {filename} exited with code {
+                      result.returncode}")
+            # A successful exit doesn't mean the account was funded,
+            # the faucet request is completed in the browser
+            elif wait_for_funding(address, FUNDING_TIMEOUT):
+                return True, attempt
+            else:
+                print(f"Account {filename} not funded after {FUNDING_TIMEOUT}s")
+
+        if attempt <= FAUCET_MAX_RETRIES:
+            time.sleep(delay + random.uniform(0, delay / 2))
+            delay *= 2
+    return False, FAUCET_MAX_RETRIES + 1
 
 
 def fund_accounts():
     """
     Funds all generated accounts using the MultiversX faucet.
     Only works for devnet and testnet chains.
-    Processes each account JSON file and calls the faucet.
+    The funded status of each account is decided by its EGLD balance,
+    checked concurrently; the faucet is requested for the accounts
+    without a balance and their balance is polled until they are funded.
     Requires mxpy CLI tool to be installed.
     """
     if (CHAIN not in ["D", "T"]):
         print("Only devnet and testnet are supported for funding accounts")
         return
 
-    account_number = 0
+    state = load_funding_state()
     json_files = list(ACC_JSON_PATH.glob("*.json"))
-    for json_file_path in json_files:
-        account_number += 1
-        input(f"\nPress any key to call the faucet and fund account number {
-              account_number} ...")
-
-        filename = json_file_path.name
-        print(f"Execute faucet for account {filename}")
-
-        exit_code = subprocess.run(["mxpy", "faucet", "request",
-                                    "--keyfile", str(json_file_path),
-                                    "--passfile", str(PASSFILE_PATH),
-                                    "--chain", CHAIN], check=True)
-        if exit_code.returncode != 0:
-            print(f"Error executing faucet for account {
-                  filename}. Check mxpy installation")
+    with ThreadPoolExecutor(max_workers=FAUCET_CONCURRENCY) as executor:
+        balances = executor.map(
+            lambda json_file_path: is_funded(get_account_address(json_file_path)),
+            json_files)
+        unfunded = [json_file_path
+                    for json_file_path, funded in zip(json_files, balances)
+                    if not funded]
+    previously_failed = sum(1 for json_file_path in unfunded
+                            if state.get(json_file_path.name, {}).get("status") == "failed")
+    print(f"\nFunding {len(unfunded)} accounts ({len(json_files) - len(unfunded)} "
+          f"already funded, {previously_failed} failed in a previous run)...")
+
+    funded = 0
+    failed = 0
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=FAUCET_CONCURRENCY) as executor:
+        futures = {executor.submit(request_faucet, json_file_path):
+                   json_file_path.name for json_file_path in unfunded}
+        for future in as_completed(futures):
+            filename = futures[future]
+            success, attempts = future.result()
+            if success:
+                funded += 1
+            else:
+                failed += 1
+                print(f"Error executing faucet for account {filename}")
+            state[filename] = {
+                "status": "funded" if success else "failed",
+                "attempts": attempts,
+                "timestamp": int(time.time())
+            }
+            save_funding_state(state)
 
+    elapsed = time.perf_counter() - start_time
+    rate = funded / elapsed if elapsed > 0 else 0
+    print(f"\nFunded {funded} accounts, {failed} failed in {
+          elapsed:.2f}s ({rate:.2f} accounts/sec)")
     print("\nDone.\n")
 
 
@@ -2,15 +2,24 @@
 This script issues tokens for all accounts found in the specified JSON files.
 Loads user wallets and initiates the token issuance process.
 """
+from concurrent.futures import Future
+from functools import partial
 from pathlib import Path
+import sys
 import time
 
 from multiversx_sdk import (
-    Address, UserWallet, ProxyNetworkProvider,
-    TransactionComputer, UserSigner, AccountNonceHolder,
+    Address, ProxyNetworkProvider, Transaction,
     TokenManagementTransactionsFactory, TransactionsFactoryConfig,
     TransactionsConverter
 )
+from multiversx_sdk.network_providers.transactions import TransactionOnNetwork
+
+sys.path.append(str(Path(__file__).parent.parent))
+from common.accounts import load_accounts  # noqa: E402
+from common.batches import send_and_track, sign_transactions  # noqa: E402
+from common.tokens import get_token_registry  # noqa: E402
+from common.tracker import TransactionTracker  # noqa: E402
 
 
 CHAIN = "D"
@@ -18,6 +27,7 @@ GATEWAY = "https://devnet-gateway.multiversx.com"
 PROXY = ProxyNetworkProvider(GATEWAY)
 
 TOKENS_PER_ACCOUNT = 1
+TRANSACTIONS_BATCH_SIZE = 100  # Number of issue transactions in each send request
 TOKEN_NAME = "WinterIsComing"
 TOKEN_TICKER_NAME = "WINTER"
 TOKEN_INITIAL_SUPPLY = 100000000
@@ -41,7 +51,8 @@ def read_accounts_password():
 
 def save_token_file(ticker: str, owner_address: Address):
     """
-    Saves the issued token's address to a file.
+    Saves the issued token's address to a file
+    and registers the token in the token registry.
     Args:
         ticker (str): The ticker symbol of the token
         ownerAddress (Address): The address of the token owner
@@ -49,47 +60,28 @@ def save_token_file(ticker: str, owner_address: Address):
     token_file = TOKEN_FILE_PATH / f"{ticker}.token"
     with open(token_file, "w", encoding="utf-8") as f:
         f.write(owner_address.to_bech32())
+    get_token_registry().add(ticker, owner_address.to_bech32())
     print(f"Token file saved to {token_file}")
 
 
-def process_transaction_result(tx_hash: str, owner_address: Address):
+def process_transaction_result(tx_hash: str, owner: str, future: Future):
     """
-    Processes the result of a transaction by checking its status
-    and logging the outcome.
-    Retries fetching the transaction status if not immediately available.
+    Processes the result of a tracked transaction by checking its status
+    and logging the outcome. Called by the tracker once the transaction
+    is finalized.
     Args:
         tx_hash (str): The transaction hash to check
-        ownerAddress (Address): The address of the token owner
+        owner (str): The bech32 address of the token owner
+        future (Future): The tracker future of the transaction
     """
-    print("Process transaction hash:", tx_hash)
-
-    # sometimes there is a delay before the transaction is available
-    retries = 0
-    while True:
-        try:
-            time.sleep(3)
-            if retries > 10:
-                print("Retry limit exceeded. Transaction not found")
-                return
-            tx_on_network = PROXY.get_transaction(tx_hash, True)
-            if tx_on_network is not None:
-                break  # transaction found
-        except Exception as e:
-            print(f"Error: {str(e)}")
-            print("Retrying...")
-        finally:
-            retries += 1
-
-    pending = None
-    while tx_on_network.status.is_pending():
-        if pending is None:
-            pending = True
-            print("Transaction is pending...")
-
-        tx_on_network = PROXY.get_transaction(tx_hash, True)
-        time.sleep(5)
-
-    print(f"Transaction status: {tx_on_network.status}")
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        print(f"Error: {str(future.exception())}")
+        return
+
+    tx_on_network: TransactionOnNetwork = future.result()
+    print(f"Transaction {tx_hash} status: {tx_on_network.status}")
 
     if tx_on_network.status.is_successful():
         converter = TransactionsConverter()
@@ -100,60 +92,44 @@ def process_transaction_result(tx_hash: str, owner_address: Address):
             if event.identifier == "issue":
                 ticker = event.topics[0].decode()
                 print(f"Successfully issued token {ticker}")
-                save_token_file(ticker, owner_address)
+                save_token_file(ticker, Address.new_from_bech32(owner))
                 return
         print(f"Cannot find issue event in transaction {tx_hash}")
     else:
         print(f"Transaction {tx_hash} failed")
 
 
-def issue_tokens_for_account(address: Address, user_signer: UserSigner):
+def build_issue_transaction(factory: TokenManagementTransactionsFactory,
+                            sender: Address):
     """
-    Issues tokens for a specified account address, creating a transaction
-    and processing its result.
+    Creates the issue transaction of an account, without its nonce and signature.
     Args:
-        address (Address): The address of the account to issue tokens for
-        user_signer (UserSigner): The signer for the transaction
+        factory (TokenManagementTransactionsFactory): The transactions factory
+        sender (Address): The address of the account to issue tokens for
+    Returns:
+        Transaction: The issue transaction
     """
-    try:
-        account_on_network = PROXY.get_account(address)
-        nonce_holder = AccountNonceHolder(account_on_network.nonce)
-
-        for _ in range(TOKENS_PER_ACCOUNT):
-
-            factory = TokenManagementTransactionsFactory(
-                TransactionsFactoryConfig(CHAIN))
-            tx = factory.create_transaction_for_issuing_fungible(
-                sender=address,
-                token_name=TOKEN_NAME,
-                token_ticker=TOKEN_TICKER_NAME,
-                initial_supply=TOKEN_INITIAL_SUPPLY * 10**TOKEN_DECIMALS,
-                num_decimals=TOKEN_DECIMALS,
-                can_freeze=True,
-                can_wipe=True,
-                can_pause=True,
-                can_change_owner=True,
-                can_upgrade=True,
-                can_add_special_roles=True
-            )
-
-            tx.nonce = nonce_holder.get_nonce_then_increment()
-            transaction_computer = TransactionComputer()
-            bytes_to_sign = transaction_computer.compute_bytes_for_signing(tx)
-            tx.signature = user_signer.sign(bytes_to_sign)
-
-            print("Sending issue transaction...")
-            tx_hash = PROXY.send_transaction(tx)
-            process_transaction_result(tx_hash, address)
-
-    except Exception as e:
-        print(f"Error for address {address.to_bech32()}: {str(e)}")
+    return factory.create_transaction_for_issuing_fungible(
+        sender=sender,
+        token_name=TOKEN_NAME,
+        token_ticker=TOKEN_TICKER_NAME,
+        initial_supply=TOKEN_INITIAL_SUPPLY * 10**TOKEN_DECIMALS,
+        num_decimals=TOKEN_DECIMALS,
+        can_freeze=True,
+        can_wipe=True,
+        can_pause=True,
+        can_change_owner=True,
+        can_upgrade=True,
+        can_add_special_roles=True
+    )
 
 
 def issue_tokens():
     """
     Issues tokens for all accounts found in the specified JSON files.
-    Loads user wallets and initiates the token issuance process.
+    Loads user wallets, signs and sends the issue transactions of all
+    accounts up front, then tracks them together and saves the token
+    files as the results arrive.
 
     Raises:
         Exception: If an error occurs during token issuance
@@ -167,13 +143,32 @@ def issue_tokens():
                   ACC_JSON_PATH}. \nUse the generate_accounts script first.")
             return
 
-        for json_file_path in json_files:
-            user_secret_key = UserWallet.load_secret_key(
-                Path(json_file_path), password)
-            address = user_secret_key.generate_public_key().to_address()
-            signer = UserSigner.from_wallet(Path(json_file_path), password)
-            print(f"\nCreating tokens for account: {address.to_bech32()}")
-            issue_tokens_for_account(address, signer)
+        factory = TokenManagementTransactionsFactory(
+            TransactionsFactoryConfig(CHAIN))
+        build_transaction = partial(build_issue_transaction, factory)
+        transactions: list[Transaction] = []
+        accounts = load_accounts(json_files, password)
+        for account in accounts:
+            print(f"Creating tokens for account: {
+                  account.address.to_bech32()}")
+            try:
+                transactions.extend(sign_transactions(
+                    account, TOKENS_PER_ACCOUNT, build_transaction, PROXY))
+            except Exception as e:
+                print(f"Error for address {account.address.to_bech32()}: {str(e)}")
+
+        start_time = time.perf_counter()
+        with TransactionTracker(PROXY) as tracker:
+            futures = send_and_track(
+                transactions, accounts, PROXY, tracker, TRANSACTIONS_BATCH_SIZE,
+                process_transaction_result, "issue")
+
+            print(f"\nWaiting for {len(futures)} issue transactions...")
+            untracked = tracker.wait_all(futures)
+
+        elapsed = time.perf_counter() - start_time
+        print(f"\nProcessed {len(futures) - untracked} issue transactions in {
+              elapsed:.2f}s ({untracked} not finalized)")
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -0,0 +1,193 @@
+"""
+Journal of the token transfer campaigns.
+Every signed transfer is recorded with its hash before it is sent, and its
+status is updated once the gateway answers. A restarted campaign resends the
+same signed transactions (same nonces) for the transfers whose outcome is
+unknown, so no receiver can be paid twice.
+"""
+from base64 import b64decode, b64encode
+from pathlib import Path
+from threading import Lock
+import json
+import sqlite3
+import time
+
+from multiversx_sdk import Transaction
+
+# Transfer statuses
+SIGNED = "signed"  # recorded before sending, outcome unknown
+ACCEPTED = "accepted"  # accepted by the gateway
+EXECUTED = "executed"  # executed successfully on the network
+FAILED = "failed"  # not accepted or not executed, the transfer has to be signed again
+
+
+def transaction_to_json(tx: Transaction) -> str:
+    """
+    Serializes a signed transaction for the journal.
+    Args:
+        tx (Transaction): The signed transaction
+    Returns:
+        str: The JSON of the transaction
+    """
+    return json.dumps({
+        "nonce": tx.nonce,
+        "value": str(tx.value),
+        "receiver": tx.receiver,
+        "sender": tx.sender,
+        "gasPrice": tx.gas_price,
+        "gasLimit": tx.gas_limit,
+        "data": b64encode(tx.data).decode(),
+        "chainID": tx.chain_id,
+        "version": tx.version,
+        "options": tx.options,
+        "signature": tx.signature.hex()
+    })
+
+
+def transaction_from_json(tx_json: str) -> Transaction:
+    """
+    Restores a signed transaction saved in the journal.
+    Args:
+        tx_json (str): The JSON of the transaction
+    Returns:
+        Transaction: The signed transaction
+    """
+    data = json.loads(tx_json)
+    return Transaction(
+        sender=data["sender"],
+        receiver=data["receiver"],
+        gas_limit=data["gasLimit"],
+        chain_id=data["chainID"],
+        nonce=data["nonce"],
+        value=int(data["value"]),
+        gas_price=data["gasPrice"],
+        data=b64decode(data["data"]),
+        version=data["version"],
+        options=data["options"],
+        signature=bytes.fromhex(data["signature"])
+    )
+
+
+class TransferJournal:
+    """
+    SQLite journal of the transfers, keyed by (token, receiver).
+    Shared by all the sender workers.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS transfers (
+                    token_id TEXT NOT NULL,
+                    receiver TEXT NOT NULL,
+                    sender TEXT NOT NULL,
+                    nonce INTEGER NOT NULL,
+                    tx_hash TEXT NOT NULL,
+                    tx_json TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (token_id, receiver)
+                )""")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS transfers_tx_hash ON transfers (tx_hash)")
+
+    def get_statuses(self, token_id: str):
+        """
+        Returns the status of the journaled transfers of a token.
+        Args:
+            token_id (str): The token ID
+        Returns:
+            dict: Receiver bech32 address mapped to the transfer status
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT receiver, status FROM transfers WHERE token_id = ?",
+                (token_id,)).fetchall()
+        return dict(rows)
+
+    def get_unresolved(self, token_id: str, sender: str):
+        """
+        Returns the transfers of a token from a sender that were signed
+        but whose outcome is unknown, in nonce order.
+        Args:
+            token_id (str): The token ID
+            sender (str): The bech32 address of the sender
+        Returns:
+            list: A list of (tx hash, signed transaction) tuples
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT tx_hash, tx_json FROM transfers "
+                "WHERE token_id = ? AND sender = ? AND status = ? ORDER BY nonce",
+                (token_id, sender, SIGNED)).fetchall()
+        return [(tx_hash, transaction_from_json(tx_json)) for tx_hash, tx_json in rows]
+
+    def get_inflight_nonces(self, sender: str):
+        """
+        Returns the nonces of the transfers from a sender that are signed
+        or accepted, whose transactions may still be executed.
+        Args:
+            sender (str): The bech32 address of the sender
+        Returns:
+            set[int]: The nonces of the transfers in flight
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT DISTINCT nonce FROM transfers "
+                "WHERE sender = ? AND status IN (?, ?)",
+                (sender, SIGNED, ACCEPTED)).fetchall()
+        return {nonce for nonce, in rows}
+
+    def get_hashes(self, status: str):
+        """
+        Returns the hashes of the transfers with a status.
+        Args:
+            status (str): The transfer status
+        Returns:
+            list[str]: The transaction hashes
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT DISTINCT tx_hash FROM transfers WHERE status = ?",
+                (status,)).fetchall()
+        return [tx_hash for tx_hash, in rows]
+
+    def record_signed(self, entries: list[tuple[str, str, Transaction, str]]):
+        """
+        Records signed transfers before they are sent.
+        Args:
+            entries (list): A list of (token ID, receiver bech32 address,
+            signed transaction, tx hash) tuples
+        """
+        now = time.time()
+        rows = [(token_id, receiver, tx.sender, tx.nonce, tx_hash,
+                 transaction_to_json(tx), SIGNED, now)
+                for token_id, receiver, tx, tx_hash in entries]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows)
+
+    def set_status(self, tx_hashes: list[str], status: str):
+        """
+        Updates the status of transfers.
+        Args:
+            tx_hashes (list[str]): The hashes of the transfer transactions
+            status (str): The new status
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE transfers SET status = ?, updated_at = ? WHERE tx_hash = ?",
+                [(status, now, tx_hash) for tx_hash in tx_hashes])
+
+    def close(self):
+        """
+        Closes the journal database.
+        """
+        with self._lock:
+            self._connection.close()
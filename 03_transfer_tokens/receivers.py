@@ -0,0 +1,126 @@
+"""
+Compact store of the receiver addresses.
+The receivers are kept as raw 32-byte public keys in a binary file that is
+memory-mapped, and their bech32 addresses are only encoded when they are
+first used. Missing receivers are generated in parallel.
+"""
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import mmap
+import os
+
+from multiversx_sdk import Address
+from nacl.signing import SigningKey
+
+PUBKEY_SIZE = 32
+GENERATE_WORKERS = os.cpu_count() or 1
+KEYS_PER_TASK = 10000
+
+
+def generate_public_keys(count: int) -> bytes:
+    """
+    Generates new key pairs and keeps their public keys.
+    Runs in a worker process.
+    Args:
+        count (int): The number of public keys to generate
+    Returns:
+        bytes: The concatenated 32-byte public keys
+    """
+    return b''.join(bytes(SigningKey.generate().verify_key) for _ in range(count))
+
+
+class ReceiversStore(Sequence):
+    """
+    Memory-mapped receivers file. Indexing returns the bech32 address of a
+    receiver, encoded on first access and cached for the rest of the run.
+    """
+
+    def __init__(self, path: Path, text_file: Path | None = None):
+        self.path = path
+        self._mmap = None
+        self._stored = 0
+        self._count = 0
+        self._bech32: dict[int, str] = {}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            self._migrate(text_file)
+        self._map()
+        self._count = self._stored
+
+    def _migrate(self, text_file: Path | None):
+        # Imports the receivers of the former bech32 text file
+        public_keys = []
+        if text_file is not None and text_file.exists():
+            with open(text_file, "r", encoding="utf-8") as f:
+                public_keys = [Address.new_from_bech32(line.strip()).get_public_key()
+                               for line in f if line.strip()]
+            print(f"Imported {len(public_keys)} receivers from {text_file}")
+        temp_file = self.path.with_suffix(".tmp")
+        with open(temp_file, "wb") as f:
+            f.write(b''.join(public_keys))
+        os.replace(temp_file, self.path)
+
+    def _map(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        size = self.path.stat().st_size
+        self._stored = size // PUBKEY_SIZE
+        if size:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def ensure(self, count: int):
+        """
+        Makes the first count receivers available, generating
+        and appending the missing ones in parallel.
+        Args:
+            count (int): The number of receivers to use
+        """
+        missing = count - self._stored
+        if missing > 0:
+            print(f"Generating {missing} receiver addresses...")
+            chunks = [min(KEYS_PER_TASK, missing - start)
+                      for start in range(0, missing, KEYS_PER_TASK)]
+            with ProcessPoolExecutor(max_workers=GENERATE_WORKERS) as executor, \
+                    open(self.path, "ab") as f:
+                for public_keys in executor.map(generate_public_keys, chunks):
+                    f.write(public_keys)
+            self._map()
+        self._count = count
+
+    def get_public_key(self, index: int) -> bytes:
+        """
+        Returns the raw public key of a receiver.
+        Args:
+            index (int): The receiver index
+        Returns:
+            bytes: The 32-byte public key
+        """
+        if not 0 <= index < self._count:
+            raise IndexError("receiver index out of range")
+        offset = index * PUBKEY_SIZE
+        return self._mmap[offset:offset + PUBKEY_SIZE]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        bech32 = self._bech32.get(index)
+        if bech32 is None:
+            bech32 = Address(self.get_public_key(index), "erd").to_bech32()
+            self._bech32[index] = bech32
+        return bech32
+
+    def close(self):
+        """
+        Unmaps the receivers file.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
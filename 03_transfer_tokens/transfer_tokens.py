@@ -2,30 +2,230 @@
 This script transfers tokens from owner accounts to receivers.
 Loads user wallets and initiates token transfers.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from base64 import b64encode
+from collections.abc import Sequence
 from pathlib import Path
+from threading import BoundedSemaphore
+import copy
+import os
+import sys
 import time
 
 from multiversx_sdk import (
-    Address, UserWallet, UserSecretKey, ProxyNetworkProvider,
-    TransactionComputer, UserSigner, AccountNonceHolder,
+    Address, ProxyNetworkProvider,
+    Transaction, TransactionComputer, UserSigner,
     TransactionsFactoryConfig, TransferTransactionsFactory,
     TokenTransfer, Token
 )
+from nacl.signing import SigningKey
+
+sys.path.append(str(Path(__file__).parent.parent))
+from common.accounts import Account, load_accounts  # noqa: E402
+from common.nonces import get_nonce_manager  # noqa: E402
+from common.submitter import AdaptiveSubmitter  # noqa: E402
+from common.tokens import get_token_registry  # noqa: E402
+from common.tracker import TransactionTracker  # noqa: E402
+from receivers import ReceiversStore  # noqa: E402
+from journal import ACCEPTED, EXECUTED, FAILED, SIGNED, TransferJournal  # noqa: E402
 
 CHAIN = "D"
 GATEWAY = "https://devnet-gateway.multiversx.com"
 PROXY = ProxyNetworkProvider(GATEWAY)
 
 TOKEN_DECIMALS = 8
+EGLD_DECIMALS = 18
 TRANSFER_AMOUNT = 10000
 RECEIVERS_COUNT = 1000
-TRANSACTIONS_BATCH_SIZE = 100  # Number of transactions to send in each batch
+TRANSACTIONS_BATCH_SIZE = 100  # Initial number of transactions in each batch
+MIN_TRANSACTIONS_BATCH_SIZE = 10  # Batch size floor under gateway pressure
+MAX_TRANSACTIONS_BATCH_SIZE = 250  # Batch size ceiling
+TARGET_LATENCY = 2.0  # Seconds, slower send requests shrink the batch size
+MAX_BATCH_DELAY = 10.0  # Seconds, ceiling of the delay between batches
+MAX_INFLIGHT_REQUESTS = 8  # Max number of concurrent gateway send requests
+SIGNING_WORKERS = os.cpu_count() or 1  # Number of batch signing threads
+# Send all the tokens of a sender to a receiver in a single multi-ESDT transfer
+MULTI_TOKEN_TRANSFER = False
+WAIT_FOR_EXECUTION = False  # Track the accepted transfers until they are executed
 
 ROOT_PATH = Path(__file__).parent.parent
 PASSFILE_PATH = ROOT_PATH / "wallets_password.txt"
 ACC_JSON_PATH = ROOT_PATH / "_accounts/json"
-TOKEN_FILE_PATH = ROOT_PATH / "_tokens"
-RECEIVERS_FILE = ROOT_PATH / "receivers.txt"
+RECEIVERS_FILE = ROOT_PATH / "receivers.txt"  # Former text store, imported once
+RECEIVERS_STORE_FILE = ROOT_PATH / "_transfers/receivers.bin"
+JOURNAL_FILE = ROOT_PATH / "_transfers/journal.sqlite"
+
+# Caps the send requests in flight across all the sender workers
+GATEWAY_SEMAPHORE = BoundedSemaphore(MAX_INFLIGHT_REQUESTS)
+# Adapts the batch size and the delay between batches to the gateway
+SUBMITTER = AdaptiveSubmitter(
+    TRANSACTIONS_BATCH_SIZE,
+    min_batch_size=MIN_TRANSACTIONS_BATCH_SIZE,
+    max_batch_size=MAX_TRANSACTIONS_BATCH_SIZE,
+    target_latency=TARGET_LATENCY,
+    max_delay=MAX_BATCH_DELAY,
+    semaphore=GATEWAY_SEMAPHORE)
+# Signs the next batches while the current ones are being sent
+SIGNING_POOL = ThreadPoolExecutor(max_workers=SIGNING_WORKERS)
+
+
+class TransferTemplate:
+    """
+    Cached ESDT transfer of a token from a sender.
+    All the transfers of a campaign are identical except for the receiver
+    and the nonce, so the transaction and its serialized signing bytes are
+    built once and only these two fields are filled in per transaction.
+    """
+
+    def __init__(self, factory: TransferTransactionsFactory,
+                 sender_address: Address, sender_signer: UserSigner,
+                 token_transfers: list[TokenTransfer]):
+        self.transaction = factory.create_transaction_for_esdt_token_transfer(
+            sender=sender_address,
+            receiver=sender_address,
+            token_transfers=token_transfers
+        )
+        self.transaction.nonce = 0
+        self.signing_key = SigningKey(sender_signer.secret_key.buffer)
+
+        # Split the signing bytes around the nonce and the receiver fields
+        serialized = TransactionComputer().compute_bytes_for_signing(
+            self.transaction)
+        nonce_field = b'{"nonce":0,'
+        head, self.tail = serialized.split(self._receiver_field(), 1)
+        if not head.startswith(nonce_field):
+            raise ValueError("Unexpected transaction signing format")
+        self.head = b',' + head[len(nonce_field):]
+
+    def _receiver_field(self):
+        # The signing bytes field that holds the receiver
+        return f'"receiver":"{self.transaction.receiver}"'.encode()
+
+    def create(self, receiver: str, nonce: int):
+        """
+        Creates and signs the transfer to a receiver.
+        Args:
+            receiver (str): The bech32 address of the receiver
+            nonce (int): The nonce of the transaction
+        Returns:
+            Transaction: The signed transaction
+        """
+        tx: Transaction = copy.copy(self.transaction)
+        tx.receiver = receiver
+        tx.nonce = nonce
+        bytes_to_sign = b''.join((
+            b'{"nonce":', str(nonce).encode(), self.head,
+            b'"receiver":"', receiver.encode(), b'"', self.tail))
+        tx.signature = self.signing_key.sign(bytes_to_sign).signature
+        return tx
+
+
+class MultiTransferTemplate(TransferTemplate):
+    """
+    Cached multi-ESDT transfer of several tokens from a sender.
+    The receiver of a multi-token transfer is encoded in the data field and
+    the transaction is sent to the sender itself, so the signing bytes are
+    split around the nonce and the data fields instead.
+    """
+
+    def __init__(self, factory: TransferTransactionsFactory,
+                 sender_address: Address, sender_signer: UserSigner,
+                 token_transfers: list[TokenTransfer]):
+        super().__init__(factory, sender_address, sender_signer, token_transfers)
+        # Split the data around the receiver public key
+        self.data_head, self.data_tail = self.transaction.data.split(
+            sender_address.to_hex().encode(), 1)
+
+    def _receiver_field(self):
+        return f'"data":"{b64encode(self.transaction.data).decode()}"'.encode()
+
+    def create(self, receiver: str, nonce: int):
+        """
+        Creates and signs the transfer to a receiver.
+        Args:
+            receiver (str): The bech32 address of the receiver
+            nonce (int): The nonce of the transaction
+        Returns:
+            Transaction: The signed transaction
+        """
+        tx: Transaction = copy.copy(self.transaction)
+        tx.data = b''.join((
+            self.data_head, Address.new_from_bech32(receiver).to_hex().encode(),
+            self.data_tail))
+        tx.nonce = nonce
+        bytes_to_sign = b''.join((
+            b'{"nonce":', str(nonce).encode(), self.head,
+            b'"data":"', b64encode(tx.data), b'"', self.tail))
+        tx.signature = self.signing_key.sign(bytes_to_sign).signature
+        return tx
+
+
+class TransferStats:
+    """
+    Counters of the transfers sent to the gateway.
+    """
+
+    def __init__(self, accepted: int = 0, rejected: int = 0, resent: int = 0,
+                 transfers: int = 0, fees: int = 0):
+        self.accepted = accepted  # accepted transactions
+        self.rejected = rejected
+        self.resent = resent
+        self.transfers = transfers  # token transfers carried by the accepted transactions
+        self.fees = fees  # max fees of the accepted transactions (gas limit x gas price)
+
+    def add(self, other: 'TransferStats'):
+        self.accepted += other.accepted
+        self.rejected += other.rejected
+        self.resent += other.resent
+        self.transfers += other.transfers
+        self.fees += other.fees
+
+    def add_accepted(self, transactions: list[Transaction], token_count: int):
+        self.accepted += len(transactions)
+        self.transfers += len(transactions) * token_count
+        self.fees += sum(tx.gas_limit * tx.gas_price for tx in transactions)
+
+    def __repr__(self) -> str:
+        return (f"TransferStats(accepted={self.accepted}, rejected={self.rejected}, "
+                f"resent={self.resent}, transfers={self.transfers}, fees={self.fees})")
+
+
+def sign_batch(template: TransferTemplate, receivers: list[str],
+               nonces: list[int]):
+    """
+    Creates and signs the transactions of a batch and computes their hashes.
+    Runs on the signing pool.
+    Args:
+        template (TransferTemplate): The cached transfer of the sender
+        receivers (list[str]): The bech32 addresses of the batch receivers
+        nonces (list[int]): The nonces reserved for the batch
+    Returns:
+        tuple: (signed transactions, transaction hashes)
+    """
+    transaction_computer = TransactionComputer()
+    transactions = [template.create(receiver, nonce)
+                    for receiver, nonce in zip(receivers, nonces)]
+    tx_hashes = [transaction_computer.compute_transaction_hash(tx).hex()
+                 for tx in transactions]
+    return transactions, tx_hashes
+
+
+def journal_entries(token_ids: list[str], receivers: list[str],
+                    transactions: list[Transaction], tx_hashes: list[str]):
+    """
+    Builds the journal entries of signed transfers. A multi-token transfer
+    has one entry per token, all sharing the same transaction.
+    Args:
+        token_ids (list[str]): The IDs of the transferred tokens
+        receivers (list[str]): The bech32 addresses of the receivers
+        transactions (list[Transaction]): The signed transactions
+        tx_hashes (list[str]): The transaction hashes
+    Returns:
+        list: A list of (token ID, receiver, signed transaction, tx hash) tuples
+    """
+    return [(token_id, receiver, tx, tx_hash)
+            for receiver, tx, tx_hash in zip(receivers, transactions, tx_hashes)
+            for token_id in token_ids]
 
 
 def read_accounts_password():
@@ -53,142 +253,401 @@ def get_owner_accounts():
 def get_or_create_receiver_addresses(count: int):
     """
     Retrieves or generates a specified number of receiver addresses.
-    If existing addresses are found in the receivers file,
+    If existing addresses are found in the receivers store,
     they are returned first.
-    New addresses are generated if there are not enough existing ones.
+    New addresses are generated in parallel if there are not enough existing ones.
+    The former receivers text file is imported when the store is created.
     Args:
         count (int): The number of receiver addresses to retrieve or create
     Returns:
-        list: A list of receiver addresses
-    """
-    receivers = []
-
-    # Read existing receivers if file exists
-    if RECEIVERS_FILE.exists():
-        with open(RECEIVERS_FILE, "r", encoding="utf-8") as f:
-            existing_receivers = [Address.from_bech32(
-                line.strip()) for line in f if line.strip()]
-            if len(existing_receivers) >= count:
-                return existing_receivers[:count]
-            else:
-                receivers.extend(existing_receivers)
-
-    # Generate new addresses if needed
-    new_receivers = []
-    for _ in range(count - len(receivers)):
-        secret_key = UserSecretKey.generate()
-        address = secret_key.generate_public_key().to_address()
-        new_receivers.append(address)
-
-    # Append new addresses to file if any were generated
-    if new_receivers:
-        with open(RECEIVERS_FILE, "a", encoding="utf-8") as f:
-            for new_address in new_receivers:
-                f.write(f"{new_address.to_bech32()}\n")
-        receivers.extend(new_receivers)
-
+        ReceiversStore: The bech32 addresses of the receivers, encoded lazily
+    """
+    receivers = ReceiversStore(RECEIVERS_STORE_FILE, RECEIVERS_FILE)
+    receivers.ensure(count)
     return receivers
 
 
 def get_account_tokens(account: Address):
     """
-    Retrieves a list of token IDs owned by the specified account.
-    It reads all token files from the _tokens folder and checks
-    if the owner matches the account.
+    Retrieves a list of token IDs owned by the specified account
+    from the token registry.
     Args:
         account (Address): The address of the account to check for tokens
     Returns:
         list: A list of token IDs owned by the account
     """
-    tokens = []
-    address = account.to_bech32()
+    return get_token_registry().get_tokens(account.to_bech32())
+
 
-    # Read all token files from _tokens folder
-    for token_file in TOKEN_FILE_PATH.glob("*.token"):
+def is_transaction_known(tx_hash: str):
+    """
+    Checks if the network knows a transaction.
+    Args:
+        tx_hash (str): The transaction hash
+    Returns:
+        bool: True if the transaction exists, False if it was not found
+    Raises:
+        Exception: If the status cannot be fetched for another reason
+    """
+    try:
+        with GATEWAY_SEMAPHORE:
+            status = PROXY.get_transaction_status(tx_hash)
+        return status.status != "unknown"
+    except Exception as e:
+        if "not found" in str(e).lower():
+            return False
+        raise
+
+
+def release_unjournaled_nonces(journal: TransferJournal, sender_address: Address):
+    """
+    Releases the nonces reserved by a previous run that were never journaled,
+    such as the nonces of a batch signed ahead when the run stopped.
+    Left pending, they would block every later transfer of the sender.
+    Args:
+        journal (TransferJournal): The transfers journal
+        sender_address (Address): The address of the sender
+    """
+    nonce_manager = get_nonce_manager(sender_address, PROXY)
+    released = nonce_manager.release_untracked(
+        journal.get_inflight_nonces(sender_address.to_bech32()))
+    if released:
+        print(f"Released {len(released)} unjournaled nonces of {
+              sender_address.to_bech32()} from {released[0]}")
+
+
+def fill_nonce_gaps(journal: TransferJournal, account: Account):
+    """
+    Fills the nonce gaps left once all the transfers of a sender are sent
+    with empty EGLD transfers to the sender itself, so the accepted
+    transfers with higher nonces are executed. The nonces of the journaled
+    transfers in flight are never filled.
+    Args:
+        journal (TransferJournal): The transfers journal
+        account (Account): The sender account
+    """
+    nonce_manager = get_nonce_manager(account.address, PROXY)
+    nonces = nonce_manager.reserve_gaps(
+        journal.get_inflight_nonces(account.address.to_bech32()))
+    if not nonces:
+        return
+
+    print(f"Filling {len(nonces)} nonce gaps of {account.address.to_bech32()}...")
+    factory = TransferTransactionsFactory(TransactionsFactoryConfig(CHAIN))
+    transaction_computer = TransactionComputer()
+    transactions = []
+    for nonce in nonces:
+        tx = factory.create_transaction_for_native_token_transfer(
+            sender=account.address,
+            receiver=account.address,
+            native_amount=0
+        )
+        tx.nonce = nonce
+        tx.signature = account.signer.sign(
+            transaction_computer.compute_bytes_for_signing(tx))
+        transactions.append(tx)
+
+    try:
+        _, sent_hashes = SUBMITTER.send(PROXY, transactions)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sent_hashes = {}
+    accepted_indices = {int(index) for index in (sent_hashes or {})}
+    nonce_manager.release([tx.nonce for index, tx in enumerate(transactions)
+                           if index not in accepted_indices])
+
+
+def resume_transfers(
+        journal: TransferJournal,
+        sender_address: Address,
+        token_ids: list[str]):
+    """
+    Resolves the transfers of a previous run whose outcome is unknown.
+    The journaled transactions are resent unchanged, so their nonces
+    guarantee they are executed at most once. Transfers the network does not
+    know are marked as failed and their nonces are released.
+    Args:
+        journal (TransferJournal): The transfers journal
+        sender_address (Address): The address of the sender
+        token_ids (list[str]): The IDs of the tokens
+    Returns:
+        TransferStats: The transfers resolved as accepted
+    """
+    # A multi-token transfer is journaled once per token
+    unresolved = {}
+    token_counts = {}
+    for token_id in token_ids:
+        for tx_hash, tx in journal.get_unresolved(token_id, sender_address.to_bech32()):
+            unresolved[tx_hash] = tx
+            token_counts[tx_hash] = token_counts.get(tx_hash, 0) + 1
+    unresolved = sorted(unresolved.items(), key=lambda item: item[1].nonce)
+    stats = TransferStats()
+    if not unresolved:
+        return stats
+
+    label = ", ".join(token_ids)
+    print(f"Resuming {len(unresolved)} unresolved {label} transfers from {
+          sender_address.to_bech32()}...")
+    nonce_manager = get_nonce_manager(sender_address, PROXY)
+    start = 0
+    while start < len(unresolved):
+        batch = unresolved[start:start + SUBMITTER.get_batch_size()]
+        start += len(batch)
         try:
-            # Each file contains the owner's address
-            with open(token_file, "r", encoding="utf-8") as f:
-                owner_address = f.read().strip()
-                if owner_address == address:
-                    # The token ID is the filename without the extension
-                    token_id = token_file.stem
-                    tokens.append(f"{token_id}")
+            _, sent_hashes = SUBMITTER.send(PROXY, [tx for _, tx in batch])
+            sent_hashes = set((sent_hashes or {}).values())
+
+            accepted = []
+            failed = []
+            for tx_hash, tx in batch:
+                if tx_hash in sent_hashes or is_transaction_known(tx_hash):
+                    accepted.append((tx_hash, tx))
+                else:
+                    failed.append((tx_hash, tx))
         except Exception as e:
-            print(f"Error reading token file {token_file}: {str(e)}")
+            print(f"Error: {str(e)}")
+            print("Unresolved transfers are left for the next run")
+            return stats
+
+        journal.set_status([tx_hash for tx_hash, _ in accepted], ACCEPTED)
+        journal.set_status([tx_hash for tx_hash, _ in failed], FAILED)
+        nonce_manager.release([tx.nonce for _, tx in failed])
+        for tx_hash, tx in accepted:
+            stats.add_accepted([tx], token_counts[tx_hash])
 
-    return tokens
+    return stats
+
+
+def send_transfers(
+        journal: TransferJournal,
+        template: TransferTemplate,
+        sender_address: Address,
+        token_ids: list[str],
+        receivers: list[str],
+        stats: TransferStats):
+    """
+    Signs and sends the transfers of a template to the receivers.
+    Every transfer is journaled before it is sent.
+    Args:
+        journal (TransferJournal): The transfers journal
+        template (TransferTemplate): The cached transfer of the sender
+        sender_address (Address): The address of the sender
+        token_ids (list[str]): The IDs of the tokens carried by the template
+        receivers (list[str]): The bech32 addresses of the receivers
+        stats (TransferStats): The counters to update
+    Returns:
+        bool: False if the retry limit was exceeded
+    """
+    nonce_manager = get_nonce_manager(sender_address, PROXY)
+    label = ", ".join(token_ids)
+    sent = 0  # receivers of this template whose transfer was accepted
+
+    def submit_batch(start: int):
+        batch = receivers[start:start + SUBMITTER.get_batch_size()]
+        nonces = nonce_manager.reserve(len(batch))
+        return (start + len(batch), batch, nonces,
+                SIGNING_POOL.submit(sign_batch, template, batch, nonces))
+
+    # Split receiver addresses into batches sized by the submitter,
+    # signing the next batch while the current one is sent
+    next_batch = submit_batch(0) if receivers else None
+    while next_batch is not None:
+        batch_end, batch_receivers, _, signing = next_batch
+        transactions, tx_hashes = signing.result()
+        next_batch = submit_batch(batch_end) \
+            if batch_end < len(receivers) else None
+
+        # Write-ahead: the batch is journaled before it is sent
+        journal.record_signed(journal_entries(
+            token_ids, batch_receivers, transactions, tx_hashes))
+
+        # Send the batch, resubmitting only the rejected transactions
+        max_retries = 10
+        retries = 0
+        while transactions:
+            if retries > max_retries:
+                # The outcome of the batch is unknown, it stays journaled
+                # as signed and is resolved by the next run
+                print("Retry limit exceeded, exiting...")
+                if next_batch is not None:
+                    next_batch[3].cancel()
+                    nonce_manager.release(next_batch[2])
+                return False
+            retries += 1
+
+            try:
+                _, sent_hashes = SUBMITTER.send(PROXY, transactions)
+            except Exception as e:
+                # Resending the same transactions is safe, their nonces
+                # prevent them from being executed twice.
+                # The submitter backs off before the next request.
+                print(f"Error: {str(e)}")
+                print("Retrying...")
+                continue
+
+            # The gateway returns the hashes of the accepted transactions,
+            # keyed by their index in the batch
+            accepted_indices = {int(index) for index in (sent_hashes or {})}
+            accepted = [index for index in range(len(transactions))
+                        if index in accepted_indices]
+            rejected = [index for index in range(len(transactions))
+                        if index not in accepted_indices]
+            journal.set_status([tx_hashes[index] for index in accepted], ACCEPTED)
+            stats.add_accepted([transactions[index] for index in accepted], len(token_ids))
+            sent += len(accepted)
+            print(f"Sent {TRANSFER_AMOUNT} {label} to {sent} of {
+                  len(receivers)} receivers from {sender_address.to_bech32()}")
+            if not rejected:
+                break
+
+            # Sign the rejected transfers again with corrected nonces: the
+            # released nonces are refilled first, once the sync has dropped
+            # the ones already passed by the network nonce, so the resent
+            # transactions are not identical to the rejected ones
+            print(f"{len(rejected)} {label} transfers rejected, resending...")
+            journal.set_status([tx_hashes[index] for index in rejected], FAILED)
+            nonce_manager.release([transactions[index].nonce for index in rejected])
+            nonce_manager.sync()
+            batch_receivers = [batch_receivers[index] for index in rejected]
+            nonces = nonce_manager.reserve(len(batch_receivers))
+            transactions, tx_hashes = sign_batch(template, batch_receivers, nonces)
+            journal.record_signed(journal_entries(
+                token_ids, batch_receivers, transactions, tx_hashes))
+            stats.rejected += len(rejected)
+            stats.resent += len(transactions)
+
+    return True
 
 
 def transfer_tokens(
+        journal: TransferJournal,
         sender_address: Address,
         sender_signer: UserSigner,
-        token_id: str,
-        receiver_addresses: list[Address]):
+        token_ids: list[str],
+        receiver_addresses: Sequence[str]):
     """
-    Transfers a specified token from the sender's address
-    to multiple receiver addresses.
+    Transfers tokens from the sender's address to multiple receiver addresses.
+    A single token is sent with an ESDT transfer; several tokens are sent
+    together to each receiver with a multi-ESDT transfer.
+    Every transfer is journaled before it is sent, so an interrupted
+    campaign resumes where it stopped and no receiver is paid twice.
     Args:
+        journal (TransferJournal): The transfers journal
         sender_address (Address): The address of the sender
         sender_signer (UserSigner): The signer for the transaction
-        token_id (str): The ID of the token to transfer
-        receiver_addresses (list[Address]):
-        A list of addresses to receive the token
+        token_ids (list[str]): The IDs of the tokens to transfer
+        receiver_addresses (Sequence[str]):
+        The bech32 addresses to receive the tokens
+    Returns:
+        TransferStats: The accepted, rejected and resent transfers
     """
-    print(f"Transferring {token_id} from {sender_address.to_bech32()} to {
-          len(receiver_addresses)} receivers...")
+    stats = resume_transfers(journal, sender_address, token_ids)
+    label = ", ".join(token_ids)
+
+    # Skip the tokens already paid or with a transfer in flight to a receiver;
+    # receivers missing the same tokens are sent the same transfer
+    statuses = {token_id: journal.get_statuses(token_id) for token_id in token_ids}
+    pending_receivers: dict[tuple[str, ...], list[str]] = {}
+    skipped = 0
+    for receiver in receiver_addresses:
+        missing = tuple(token_id for token_id in token_ids
+                        if statuses[token_id].get(receiver) not in (SIGNED, ACCEPTED, EXECUTED))
+        skipped += len(token_ids) - len(missing)
+        if missing:
+            pending_receivers.setdefault(missing, []).append(receiver)
+    if skipped:
+        print(f"Skipping {skipped} transfers already journaled for {label}")
 
     config = TransactionsFactoryConfig(CHAIN)
     token_transfer_factory = TransferTransactionsFactory(config)
+    for missing, receivers in pending_receivers.items():
+        missing_label = ", ".join(missing)
+        print(f"Transferring {missing_label} from {sender_address.to_bech32()} to {
+              len(receivers)} receivers...")
+        token_transfers = [TokenTransfer(
+            token=Token(token_id),
+            amount=TRANSFER_AMOUNT * 10**TOKEN_DECIMALS
+        ) for token_id in missing]
+        template_class = MultiTransferTemplate if len(missing) > 1 else TransferTemplate
+        template = template_class(
+            token_transfer_factory, sender_address, sender_signer, token_transfers)
+        if not send_transfers(journal, template, sender_address, list(missing), receivers, stats):
+            break
+
+    return stats
+
+
+def transfer_account_tokens(
+        journal: TransferJournal,
+        account: Account,
+        receivers: Sequence[str]):
+    """
+    Transfers all the tokens owned by an account to the receivers.
+    Runs as the worker of a single sender account.
+    Args:
+        journal (TransferJournal): The transfers journal
+        account (Account): The sender account
+        receivers (Sequence[str]): The bech32 addresses to receive the tokens
+    Returns:
+        TransferStats: The accepted, rejected and resent transfers
+    """
+    print(f"\nProcessing account: {account.address.to_bech32()}")
+
+    # Get all tokens owned by this account
+    tokens = get_account_tokens(account.address)
+    if not tokens:
+        print(f"No tokens found for account {account.address.to_bech32()}. "
+              "Run the issue_tokens script first.")
+        return TransferStats()
+
+    # The released nonces are reused by the transfers signed again below
+    release_unjournaled_nonces(journal, account.address)
+
+    if MULTI_TOKEN_TRANSFER:
+        # All the tokens are sent to each receiver in a single transaction
+        stats = transfer_tokens(
+            journal, account.address, account.signer, tokens, receivers)
+    else:
+        # Transfer each token to receivers
+        stats = TransferStats()
+        for token_id in tokens:
+            stats.add(transfer_tokens(
+                journal, account.address, account.signer, [token_id], receivers))
 
-    account_on_network = PROXY.get_account(sender_address)
-    nonce_holder = AccountNonceHolder(account_on_network.nonce)
-    transaction_computer = TransactionComputer()
-    receiver_counter = 0
-    # Split receiver addresses into batches
-    for i in range(0, len(receiver_addresses), TRANSACTIONS_BATCH_SIZE):
-        batch = receiver_addresses[i:i + TRANSACTIONS_BATCH_SIZE]
-        transactions = []
-
-        for receiver in batch:
-            tx = token_transfer_factory.create_transaction_for_esdt_token_transfer(
-                sender=sender_address,
-                receiver=receiver,
-                token_transfers=[
-                    TokenTransfer(
-                        token=Token(token_id),
-                        amount=TRANSFER_AMOUNT * 10**TOKEN_DECIMALS
-                    )
-                ]
-            )
-
-            tx.nonce = nonce_holder.get_nonce_then_increment()
-            bytes_to_sign = transaction_computer.compute_bytes_for_signing(tx)
-            tx.signature = sender_signer.sign(bytes_to_sign)
-            transactions.append(tx)
-
-        # Retry in case of sending error
-        max_retries = 10
-        retries = 0
-        while True:
-            try:
-                if retries > max_retries:
-                    print("Retry limit exceeded, exiting...")
-                    return
-
-                # Send the batch of transactions
-                PROXY.send_transactions(transactions)
-                # Optional: Add a delay between batches for rate limiting
-                # time.sleep(1)
-                receiver_counter += TRANSACTIONS_BATCH_SIZE
-                print(f"Sent {TRANSFER_AMOUNT} {token_id} to {
-                      receiver_counter} receivers")
-                break
-            except Exception as e:
-                print(f"Error: {str(e)}")
-                print("Retrying...")
-                time.sleep(1)
-            finally:
-                retries += 1
+    # Nonces left over when there were fewer transfers to send than released nonces
+    fill_nonce_gaps(journal, account)
+    return stats
+
+
+def wait_for_execution(journal: TransferJournal):
+    """
+    Tracks all the accepted transfers together until they are executed.
+    Transfers that failed on the network are marked as failed,
+    so the next run signs them again.
+    Args:
+        journal (TransferJournal): The transfers journal
+    """
+    tx_hashes = journal.get_hashes(ACCEPTED)
+    if not tx_hashes:
+        return
+
+    print(f"\nWaiting for {len(tx_hashes)} transfers to be executed...")
+    with TransactionTracker(PROXY) as tracker:
+        futures = tracker.track_all(tx_hashes)
+        untracked = tracker.wait_all(futures)
+
+    executed = []
+    failed = []
+    for tx_hash, future in futures.items():
+        if future.exception() is not None:
+            continue
+        if future.result().status.is_successful():
+            executed.append(tx_hash)
+        else:
+            failed.append(tx_hash)
+    journal.set_status(executed, EXECUTED)
+    journal.set_status(failed, FAILED)
+    print(f"Executed: {len(executed)}, failed: {len(failed)}, not finalized: {untracked}")
 
 
 def main():
@@ -196,7 +655,7 @@ def main():
     Main entry point of the script. Processes the transfer of tokens
     from owner accounts to receivers.
     Loads the password, retrieves owner accounts,
-    and initiates token transfers.
+    and runs the token transfers of every sender account in parallel.
     """
     password = read_accounts_password()
     owner_accounts = get_owner_accounts()
@@ -205,27 +664,42 @@ def main():
               "Run the generate_accounts script first.")
         return
 
-    for account_json in owner_accounts:
-        user_secret_key = UserWallet.load_secret_key(
-            Path(account_json), password)
-        sender_address = user_secret_key.generate_public_key().to_address()
-        sender_signer = UserSigner.from_wallet(Path(account_json), password)
-
-        print(f"\nProcessing account: {sender_address.to_bech32()}")
-
-        # Get all tokens owned by this account
-        tokens = get_account_tokens(sender_address)
-        if not tokens:
-            print("No tokens found for this account."
-                  "Run the issue_tokens script first.")
-            continue
-
-        # Get receivers
-        receivers = get_or_create_receiver_addresses(RECEIVERS_COUNT)
-
-        # Transfer each token to receivers
-        for token_id in tokens:
-            transfer_tokens(sender_address, sender_signer, token_id, receivers)
+    accounts = load_accounts(owner_accounts, password)
+
+    # Get receivers, loaded once and shared by all the sender workers
+    receivers = get_or_create_receiver_addresses(RECEIVERS_COUNT)
+
+    journal = TransferJournal(JOURNAL_FILE)
+
+    # One worker per sender account
+    stats = TransferStats()
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+            futures = {executor.submit(transfer_account_tokens,
+                                       journal, account, receivers):
+                       account for account in accounts}
+            for future in as_completed(futures):
+                try:
+                    stats.add(future.result())
+                except Exception as e:
+                    print(f"Error for account {
+                          futures[future].address.to_bech32()}: {str(e)}")
+        elapsed = time.perf_counter() - start_time
+        if WAIT_FOR_EXECUTION:
+            wait_for_execution(journal)
+    finally:
+        journal.close()
+        receivers.close()
+
+    print(f"\nSent {stats.accepted} transactions carrying {stats.transfers} token transfers from {
+          len(accounts)} accounts in {elapsed:.2f}s ({
+          stats.accepted / elapsed:.1f} tx/s, {stats.transfers / elapsed:.1f} transfers/s)")
+    print(f"Accepted: {stats.accepted}, rejected: {
+          stats.rejected}, resent: {stats.resent}")
+    mode = "multi-token" if MULTI_TOKEN_TRANSFER else "single-token"
+    print(f"Max fees: {stats.fees / 10**EGLD_DECIMALS:.6f} EGLD ({mode} transfers)")
+    SUBMITTER.report()
 
 
 if __name__ == "__main__":
@@ -3,26 +3,52 @@ This script processes each account found in the accounts directory:
 - Loads the account's wallet
 - Fetches the account's transactions from the MultiversX API
 - Displays transaction details
-- Writes the transactions to a JSON file for later use
+- Writes the transactions to a local store for later use
+The transactions are streamed page by page from the API to the outputs
+(console, local store, JSON lines and CSV files).
+The export command writes the stored transactions to a JSON, JSON lines
+or CSV file.
+In sync mode the accounts are processed in parallel without prompts,
+and only the transactions newer than the previous sync are fetched.
 """
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 from pathlib import Path
 import json
+import os
+import sys
+import time
 import requests
 
-from multiversx_sdk import Address, UserWallet, ApiNetworkProvider
+from multiversx_sdk import Address, ApiNetworkProvider
 from multiversx_sdk.network_providers.api_network_provider import (
-    DefaultPagination, TransactionOnNetwork
+    TransactionOnNetwork
 )
 
+sys.path.append(str(Path(__file__).parent.parent))
+from common.accounts import load_accounts  # noqa: E402
+from sinks import (  # noqa: E402
+    ConsoleSink, CsvSink, JsonLinesSink, StoreSink, TransactionSink, write_pages
+)
+from store import TransactionStore  # noqa: E402
+
 ROOT_PATH = Path(__file__).parent.parent
 TRANSACTIONS_FILE = Path(__file__).parent / "transactions.json"
 PASSFILE_PATH = ROOT_PATH / "wallets_password.txt"
 ACC_JSON_PATH = ROOT_PATH / "_accounts/json"
+SYNC_STATE_FILE = ROOT_PATH / "_transactions/sync_state.json"
+TRANSACTIONS_STORE_FILE = ROOT_PATH / "_transactions/transactions.sqlite"
 
 
 BATCH_SIZE = 100  # Number of transactions to fetch in each batch
 API_URL = "https://devnet-api.multiversx.com"  # MultiversX API endpoint
+SYNC_MODE = True  # Non-interactive incremental sync of all the accounts
+PAGE_WORKERS = 4  # Number of concurrent page requests per account
+ACCOUNT_WORKERS = 4  # Number of accounts synced in parallel
+API_WINDOW = 10000  # Max from+size of the API pagination
+SLICE_SIZE = 5000  # Max number of transactions fetched in a single time range
+INDEXING_LAG = 120  # Seconds the API may take to index a transaction, newer ones wait for the next sync
 
 
 def read_accounts_password():
@@ -47,99 +73,476 @@ def get_accounts():
     return accounts
 
 
-def get_transaction_count(address: Address):
+def build_time_range_params(after: int | None = None, before: int | None = None):
     """
-    Retrieves the total number of transactions for a specific address.
+    Builds the query string of a timestamp range.
+    Args:
+        after (int): Only transactions with a timestamp after this one
+        before (int): Only transactions with a timestamp before this one
+    Returns:
+        str: The query parameters, starting with '&' if any
+    """
+    params = ""
+    if after is not None:
+        params += f"&after={after}"
+    if before is not None:
+        params += f"&before={before}"
+    return params
+
+
+def request_transaction_count(address: Address, after: int | None = None,
+                              before: int | None = None):
+    """
+    Requests the number of transactions of an address in a timestamp range.
     Args:
         address (Address): The account address
+        after (int): Only count transactions with a timestamp after this one
+        before (int): Only count transactions with a timestamp before this one
     Returns:
-        int: Total number of transactions, or None if an error occurs
+        int: The number of transactions
+    Raises:
+        requests.exceptions.RequestException: If the request fails
     """
     api_url = f"{API_URL}/accounts/{address.to_bech32()}/transactions/count"
+    time_range = build_time_range_params(after, before)
+    if time_range:
+        api_url += "?" + time_range[1:]
     headers = {'accept': 'application/json'}
+    response = requests.get(api_url, headers=headers, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_transaction_count(address: Address, after: int | None = None,
+                          before: int | None = None):
+    """
+    Retrieves the total number of transactions for a specific address.
+    Args:
+        address (Address): The account address
+        after (int): Only count transactions with a timestamp after this one
+        before (int): Only count transactions with a timestamp before this one
+    Returns:
+        int: Total number of transactions, or 0 if an error occurs
+    """
     count = 0
     try:
-        response = requests.get(api_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        count = response.json()
+        count = request_transaction_count(address, after, before)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching transaction count: {e}")
     return count
 
 
-def get_transactions(address: Address, count: int):
+def plan_time_slices(address: Address, count: int, after: int | None,
+                     before: int):
+    """
+    Splits a timestamp range into slices of at most SLICE_SIZE transactions,
+    so every page stays within the from+size window of the API.
+    The ranges above the slice size are halved and the halves are counted
+    concurrently, one level at a time.
+    Args:
+        address (Address): The account address
+        count (int): The number of transactions of the range
+        after (int): The start of the range, None for the whole history
+        before (int): The end of the range
+    Returns:
+        list[tuple]: (after, before, count) of each slice, newest first
+    """
+    slices = []
+    pending = [(after or 0, before, count)]
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        while pending:
+            halves = []
+            for start, end, slice_count in pending:
+                if slice_count <= SLICE_SIZE:
+                    slices.append((start, end, slice_count))
+                elif end - start < 2:
+                    # A range of a second can't be split further
+                    if slice_count > API_WINDOW:
+                        print(f"Warning: {slice_count} transactions between {start} "
+                              f"and {end}, only {API_WINDOW} can be fetched")
+                    slices.append((start, end, min(slice_count, API_WINDOW)))
+                else:
+                    # The bounds are inclusive, the halves share their middle second
+                    middle = (start + end) // 2
+                    halves.extend([(middle, end), (start, middle)])
+            counts = executor.map(lambda r: request_transaction_count(address, *r), halves)
+            pending = [(start, end, slice_count)
+                       for (start, end), slice_count in zip(halves, counts)
+                       if slice_count]
+    slices.sort(key=lambda s: s[1], reverse=True)
+    return slices
+
+
+def get_transactions_page(api_provider: ApiNetworkProvider, address: Address,
+                          start: int, size: int, after: int | None = None,
+                          before: int | None = None):
+    """
+    Retrieves a page of transactions for an address.
+    Args:
+        api_provider (ApiNetworkProvider): The API network provider
+        address (Address): The account address
+        start (int): The index of the first transaction of the page
+        size (int): The number of transactions of the page
+        after (int): Only transactions with a timestamp after this one
+        before (int): Only transactions with a timestamp before this one
+    Returns:
+        list: The transactions of the page
+    """
+    url = (f"accounts/{address.to_bech32()}/transactions?from={start}&size={size}"
+           f"{build_time_range_params(after, before)}")
+    response = api_provider.do_get_generic_collection(url)
+    return [TransactionOnNetwork.from_api_http_response(tx.get("txHash", ""), tx)
+            for tx in response]
+
+
+def get_transaction_pages(address: Address, count: int, after: int | None = None,
+                          before: int | None = None):
     """
     Retrieves all transactions for an address in batches.
+    The pages are planned from the transaction count and fetched concurrently,
+    a few pages ahead of the consumer, and yielded in order. Histories larger
+    than a slice are split into timestamp ranges, so the page offsets stay
+    within the API window.
     Args:
         address (str): The account address
         count (int): Total number of transactions
+        after (int): Only transactions with a timestamp after this one
+        before (int): Only transactions with a timestamp before this one
+    Yields:
+        list[dict]: The transactions of a page, as dictionaries
+    """
+    if (count or 0) > SLICE_SIZE:
+        slices = plan_time_slices(address, count, after, before or int(time.time()))
+        print(f"Fetching {count} transactions in {len(slices)} time slices")
+    else:
+        slices = [(after, before, count or 0)]
+    # Each page is (after, before, start) of its slice
+    page_requests = ((start, end, page_start)
+                     for start, end, slice_count in slices
+                     for page_start in range(0, slice_count, BATCH_SIZE))
+
+    api_provider = ApiNetworkProvider(API_URL)
+    retrieved = 0
+    previous_hashes = set()
+    boundaries = {start for start, _, _ in slices}
+    boundary_hashes = set()
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        pending = deque()
+        while True:
+            # Keep a bounded number of pages in flight
+            for page_after, page_before, start in page_requests:
+                pending.append(executor.submit(
+                    get_transactions_page, api_provider, address,
+                    start, BATCH_SIZE, page_after, page_before))
+                if len(pending) >= PAGE_WORKERS * 2:
+                    break
+            if not pending:
+                return
+
+            transaction_batch = pending.popleft().result()
+            # Transactions arriving during the fetch can shift the pages by
+            # a few transactions, skip the ones of the previous page, and the
+            # ones of the second shared by two slices
+            page = [tx.to_dictionary() for tx in transaction_batch
+                    if tx.hash not in previous_hashes and tx.hash not in boundary_hashes]
+            previous_hashes = {tx.hash for tx in transaction_batch}
+            boundary_hashes.update(tx["hash"] for tx in page
+                                   if tx["timestamp"] in boundaries)
+            retrieved += len(page)
+            print(f"Retrieved {retrieved} / {count} transactions...")
+            yield page
+
+
+def get_transactions_by_hash(api_provider: ApiNetworkProvider, hashes: list[str]):
+    """
+    Retrieves transactions by hash.
+    Args:
+        api_provider (ApiNetworkProvider): The API network provider
+        hashes (list[str]): The transaction hashes, at most BATCH_SIZE
     Returns:
-        list: List of all transactions, or None if an error occurs
+        list: The transactions found
     """
+    url = f"transactions?hashes={','.join(hashes)}&size={len(hashes)}"
+    response = api_provider.do_get_generic_collection(url)
+    return [TransactionOnNetwork.from_api_http_response(tx.get("txHash", ""), tx)
+            for tx in response]
+
+
+def refresh_pending_transactions(store: TransactionStore):
+    """
+    Fetches again the stored transactions that were pending when they were
+    synced, so their final status replaces the pending one. They are older
+    than the high-water marks, the incremental sync never fetches them again.
+    Args:
+        store (TransactionStore): The transaction store
+    Returns:
+        int: The number of refreshed transactions
+    """
+    hashes = store.get_pending_hashes()
+    if not hashes:
+        return 0
+
     api_provider = ApiNetworkProvider(API_URL)
-    pagination = DefaultPagination()
-    pagination.size = BATCH_SIZE
-    pagination.start = 0
-    transactions = []
-    while transaction_batch := api_provider.get_account_transactions(
-            address, pagination):
-        if transaction_batch is None:
-            break
-        transactions.extend(transaction_batch)
-        pagination.start += pagination.size
-        print(f"Retrieved {len(transactions)} / {count} transactions...")
-    return transactions
-
-
-def display_transactions(transactions: list[TransactionOnNetwork]):
-    """
-    Displays transaction details in a formatted manner.
+    batches = [hashes[start:start + BATCH_SIZE]
+               for start in range(0, len(hashes), BATCH_SIZE)]
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=PAGE_WORKERS) as executor:
+        for transactions in executor.map(
+                lambda batch: get_transactions_by_hash(api_provider, batch), batches):
+            refreshed += store.upsert_dictionaries(
+                [tx.to_dictionary() for tx in transactions])
+    print(f"Refreshed {refreshed} of {len(hashes)} pending transactions")
+    return refreshed
+
+
+def load_sync_state():
+    """
+    Loads the high-water marks of the previous syncs.
+    Returns:
+        dict: Account bech32 address mapped to its latest synced timestamp
+        and the hashes of the transactions with that timestamp
+    """
+    if not SYNC_STATE_FILE.exists():
+        return {}
+    with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_sync_state(state: dict):
+    """
+    Saves the high-water marks of the accounts.
     Args:
-        transactions (list): List of transaction dictionaries to display
+        state (dict): The sync state
     """
-    if not transactions:
-        print("No transactions found or error occurred")
-        return
+    SYNC_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = SYNC_STATE_FILE.with_suffix(".tmp")
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+    os.replace(temp_file, SYNC_STATE_FILE)
+
+
+def sync_account(address: Address, account_state: dict | None, before: int,
+                 sinks: list[TransactionSink], display: bool = False):
+    """
+    Streams the transactions of an account newer than its high-water mark
+    to the sinks.
+    Args:
+        address (Address): The account address
+        account_state (dict): The high-water mark of the previous sync, if any
+        before (int): The timestamp the sync stops at
+        sinks (list[TransactionSink]): The output sinks
+        display (bool): Display the transactions, each line prefixed with the address
+    Returns:
+        tuple: (number of new transactions, updated high-water mark)
+    """
+    account_state = account_state or {"timestamp": None, "hashes": []}
+    after = account_state["timestamp"]
+    tx_count = get_transaction_count(address, after, before)
+    print(f"{address.to_bech32()}: {tx_count} transactions to sync")
+
+    # The range bounds are inclusive, skip the transactions already synced
+    known_hashes = set(account_state["hashes"])
+    latest = after
+    latest_hashes = list(account_state["hashes"])
+    fetched = 0
+
+    def new_pages():
+        nonlocal latest, latest_hashes, fetched
+        for page in get_transaction_pages(address, tx_count, after, before):
+            fetched += len(page)
+            page = [tx for tx in page if tx["hash"] not in known_hashes]
+            for tx in page:
+                if latest is None or tx["timestamp"] > latest:
+                    latest = tx["timestamp"]
+                    latest_hashes = [tx["hash"]]
+                elif tx["timestamp"] == latest:
+                    latest_hashes.append(tx["hash"])
+            yield page
+
+    # The accounts are synced in parallel, each one has its own console
+    console = None
+    if display:
+        console = ConsoleSink(f"Transactions of {address.to_bech32()}:",
+                              prefix=f"{address.to_bech32()} ")
+        sinks = sinks + [console]
+    try:
+        count = write_pages(new_pages(), sinks)
+    finally:
+        if console is not None:
+            console.close()
+    # The count can be ahead of the list while the API indexes the range,
+    # the pages then miss its oldest transactions, so it is synced again
+    if fetched < tx_count:
+        print(f"{address.to_bech32()}: fetched {fetched} of {
+              tx_count} transactions, keeping the previous high-water mark")
+        return count, account_state
+    return count, {"timestamp": latest, "hashes": latest_hashes}
 
-    print("\nTransaction History:")
-    print("-" * 80)
-    counter = 0
-    for tx in transactions:
-        formatted_timestamp = datetime.fromtimestamp(
-            tx.timestamp).strftime('%Y-%m-%d %H:%M:%S')
-        counter += 1
-        print(
-            f"{counter:04d}. "
-            f"{formatted_timestamp} "
-            f"Hash: {tx.hash} "
-            f"Value:{tx.value} "
-            f"Data:{tx.data}"
-        )
 
-    print("-" * 80)
+def open_transaction_store():
+    """
+    Opens the local transaction store. When the store is created,
+    the transactions of the former JSON file are imported.
+    Returns:
+        TransactionStore: The transaction store
+    """
+    created = not TRANSACTIONS_STORE_FILE.exists()
+    store = TransactionStore(TRANSACTIONS_STORE_FILE)
+    if created and TRANSACTIONS_FILE.exists():
+        imported = store.import_json(TRANSACTIONS_FILE)
+        print(f"Imported {imported} transactions from {TRANSACTIONS_FILE}")
+    return store
 
 
-def save_transactions_to_json(
-        transactions: list[TransactionOnNetwork]):
+def create_file_sinks(jsonl_file: Path | None, csv_file: Path | None):
     """
-    Saves transaction data to a JSON file.
+    Creates the file sinks requested on the command line.
     Args:
-        transactions (list): List of transaction to save
+        jsonl_file (Path): The JSON lines file, if any
+        csv_file (Path): The CSV file, if any
+    Returns:
+        list[TransactionSink]: The file sinks
     """
-    transactions_data = [tx.to_dictionary() for tx in transactions]
-    with open(TRANSACTIONS_FILE, "w", encoding="utf-8") as f:
-        json.dump(transactions_data, f, indent=4)
-    print(f"Transactions saved to: {TRANSACTIONS_FILE}")
+    sinks = []
+    if jsonl_file is not None:
+        sinks.append(JsonLinesSink(jsonl_file))
+    if csv_file is not None:
+        sinks.append(CsvSink(csv_file))
+    return sinks
+
+
+def export_transactions(store: TransactionStore, output: Path,
+                        output_format: str = "json", **filters):
+    """
+    Exports the stored transactions to a file, streaming them page by page.
+    Args:
+        store (TransactionStore): The transaction store
+        output (Path): The output file
+        output_format (str): The file format: json, jsonl or csv
+        **filters: The sender, receiver, token_id, after, before and limit filters
+    """
+    if output_format == "json":
+        exported = store.export_json(output, **filters)
+        print(f"{exported} transactions exported to: {output}")
+        return
+
+    sink = JsonLinesSink(output) if output_format == "jsonl" else CsvSink(output)
+    try:
+        write_pages(store.query_pages(**filters), [sink])
+    finally:
+        sink.close()
+
+
+def sync_transactions(store: TransactionStore, accounts: list[Address],
+                      sinks: list[TransactionSink], display: bool = False):
+    """
+    Syncs the transactions of all the accounts in parallel, without prompts.
+    Only the transactions newer than the previous sync are fetched, and they
+    are streamed to the local store and to the other sinks.
+    Args:
+        store (TransactionStore): The transaction store
+        accounts (list[Address]): The account addresses
+        sinks (list[TransactionSink]): The other output sinks
+        display (bool): Display the synced transactions
+    """
+    state = load_sync_state()
+    # A fixed upper bound keeps the planned pages stable during the sync,
+    # it lags behind, so the transactions the API is still indexing,
+    # such as cross-shard ones, are not skipped by the high-water marks
+    before = int(time.time()) - INDEXING_LAG
+    start_time = time.perf_counter()
+    try:
+        refresh_pending_transactions(store)
+    except Exception as e:
+        print(f"Error refreshing pending transactions: {str(e)}")
+    sinks = [StoreSink(store)] + sinks
+
+    synced = 0
+    with ThreadPoolExecutor(max_workers=ACCOUNT_WORKERS) as executor:
+        futures = {address.to_bech32(): executor.submit(
+            sync_account, address, state.get(address.to_bech32()), before, sinks, display)
+            for address in accounts}
+        for bech32, future in futures.items():
+            try:
+                count, state[bech32] = future.result()
+                synced += count
+            except Exception as e:
+                print(f"Error syncing account {bech32}: {str(e)}")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"\nSynced {synced} new transactions of {
+          len(accounts)} accounts in {elapsed:.2f}s")
+
+    # The high-water marks only move once the transactions are saved
+    save_sync_state(state)
+
+
+def parse_arguments():
+    """
+    Parses the command line arguments.
+    Returns:
+        argparse.Namespace: The arguments
+    """
+    parser = argparse.ArgumentParser(description="MultiversX account transactions")
+    parser.add_argument("--jsonl", type=Path, help="also write the fetched transactions to a JSON lines file")
+    parser.add_argument("--csv", type=Path, help="also write the fetched transactions to a CSV file")
+    parser.add_argument("--display", action="store_true", help="display the synced transactions")
+    subparsers = parser.add_subparsers(dest="command")
+    export_parser = subparsers.add_parser(
+        "export", help="export the stored transactions to a file")
+    export_parser.add_argument("--sender", help="bech32 address of the sender")
+    export_parser.add_argument("--receiver", help="bech32 address of the receiver")
+    export_parser.add_argument("--token", dest="token_id", help="ID of a transferred token")
+    export_parser.add_argument("--after", type=int, help="min timestamp")
+    export_parser.add_argument("--before", type=int, help="max timestamp")
+    export_parser.add_argument("--limit", type=int, help="max number of transactions")
+    export_parser.add_argument("--format", dest="output_format", default="json",
+                               choices=["json", "jsonl", "csv"], help="output file format")
+    export_parser.add_argument("--output", type=Path, default=TRANSACTIONS_FILE,
+                               help="file to write")
+    return parser.parse_args()
 
 
 def main():
     """
     Main entry point of the script.
-    Processes each account found in the accounts directory:
+    The export command writes the stored transactions to a file.
+    In sync mode, syncs the new transactions of all the accounts.
+    Otherwise processes each account found in the accounts directory:
     - Loads the account's wallet
     - Retrieves transaction count and transaction history
     - Displays transaction details
-    - Saves transactions to a JSON file
+    - Saves transactions to the local store
+    """
+    args = parse_arguments()
+    store = open_transaction_store()
+    try:
+        if args.command == "export":
+            export_transactions(
+                store, args.output, args.output_format, sender=args.sender,
+                receiver=args.receiver, token_id=args.token_id, after=args.after,
+                before=args.before, limit=args.limit)
+            return
+
+        sinks = create_file_sinks(args.jsonl, args.csv)
+        try:
+            process_accounts(store, sinks, args.display)
+        finally:
+            for sink in sinks:
+                sink.close()
+    finally:
+        store.close()
+
+
+def process_accounts(store: TransactionStore, sinks: list[TransactionSink],
+                     display: bool = False):
+    """
+    Retrieves the transactions of each account found in the accounts
+    directory and streams them to the local store and to the sinks.
+    Args:
+        store (TransactionStore): The transaction store
+        sinks (list[TransactionSink]): The file sinks
+        display (bool): Display the transactions in sync mode
     """
     password = read_accounts_password()
     accounts = list(ACC_JSON_PATH.glob("*.json"))
@@ -149,25 +552,29 @@ def main():
               "Run the generate_accounts script first.")
         return
 
-    all_transactions = []
-    for account_json in accounts:
-        user_secret_key = UserWallet.load_secret_key(
-            Path(account_json), password)
-        account_address = user_secret_key.generate_public_key().to_address()
+    if SYNC_MODE:
+        sync_transactions(store, [account.address
+                                  for account in load_accounts(accounts, password)],
+                          sinks, display)
+        return
+
+    # The pages are saved as they are fetched
+    if input("\nSave transactions? (y/n)\n") == "y":
+        sinks = sinks + [StoreSink(store)]
+
+    for account in load_accounts(accounts, password):
+        account_address = account.address
 
         input(f"\nPress any key to process account: {
               account_address.to_bech32()}\n")
         tx_count = get_transaction_count(account_address)
         print(f"Transaction count: {tx_count}\n")
-        account_transactions = get_transactions(account_address, tx_count)
-
-        display_transactions(account_transactions)
-        all_transactions.extend(account_transactions)
 
-    # Save transactions to a JSON file
-    if len(all_transactions) > 0 and (
-            input("\nSave transactions to file? (y/n)\n")) == "y":
-        save_transactions_to_json(all_transactions)
+        console = ConsoleSink()
+        write_pages(get_transaction_pages(account_address, tx_count,
+                                          before=int(time.time())),
+                    sinks + [console])
+        console.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+"""
+Output sinks of the transaction pipeline.
+Pages of transactions, in the format of TransactionOnNetwork.to_dictionary,
+flow from the API or from the local store to the sinks one page at a time,
+so memory stays bounded by the page size.
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+import csv
+import json
+
+from store import TransactionStore
+
+CSV_COLUMNS = ["timestamp", "hash", "sender", "receiver", "value", "status", "data"]
+
+
+@lru_cache(maxsize=4096)
+def _format_minute(minute: int):
+    # All timezone offsets are whole minutes, so the seconds can be appended
+    return datetime.fromtimestamp(minute * 60).strftime('%Y-%m-%d %H:%M:')
+
+
+def format_timestamp(timestamp: int):
+    """
+    Formats a transaction timestamp in local time.
+    The date and time up to the minute are cached, the transactions of an
+    account are mostly clustered in time.
+    Args:
+        timestamp (int): The UNIX timestamp
+    Returns:
+        str: The formatted timestamp (YYYY-MM-DD HH:MM:SS)
+    """
+    minute, second = divmod(int(timestamp), 60)
+    return f"{_format_minute(minute)}{second:02d}"
+
+
+class TransactionSink(ABC):
+    """
+    Base sink, receives the transactions page by page.
+    Pages can be written from several threads.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = Lock()
+
+    def write(self, transactions: list[dict]):
+        """
+        Writes a page of transactions.
+        Args:
+            transactions (list[dict]): The transactions of the page
+        """
+        with self._lock:
+            self._write(transactions)
+            self.count += len(transactions)
+
+    @abstractmethod
+    def _write(self, transactions: list[dict]):
+        """
+        Writes a page of transactions, called under the sink lock.
+        Args:
+            transactions (list[dict]): The transactions of the page
+        """
+
+    def close(self):
+        """
+        Flushes and closes the sink.
+        """
+
+
+class ConsoleSink(TransactionSink):
+    """
+    Displays the transactions of an account in a formatted manner.
+    The lines can be prefixed, so the lines of accounts displayed
+    in parallel can be told apart.
+    """
+
+    def __init__(self, title: str = "Transaction History:", prefix: str = ""):
+        super().__init__()
+        self.title = title
+        self.prefix = prefix
+
+    def _write(self, transactions: list[dict]):
+        lines = []
+        if self.count == 0 and transactions:
+            lines.extend((f"\n{self.title}", "-" * 80))
+        for counter, tx in enumerate(transactions, self.count + 1):
+            lines.append(
+                f"{self.prefix}{counter:04d}. "
+                f"{format_timestamp(tx['timestamp'])} "
+                f"Hash: {tx['hash']} "
+                f"Value:{tx['value']} "
+                f"Data:{tx['data']}"
+            )
+        if lines:
+            print("\n".join(lines))
+
+    def close(self):
+        if self.count == 0:
+            print(f"{self.prefix}No transactions found or error occurred")
+        else:
+            print("-" * 80)
+
+
+class JsonLinesSink(TransactionSink):
+    """
+    Writes one JSON transaction per line.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write(self, transactions: list[dict]):
+        self._file.writelines(json.dumps(tx) + "\n" for tx in transactions)
+
+    def close(self):
+        self._file.close()
+        print(f"{self.count} transactions written to: {self.path}")
+
+
+class CsvSink(TransactionSink):
+    """
+    Writes the main fields of the transactions as CSV rows.
+    """
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_COLUMNS)
+
+    def _write(self, transactions: list[dict]):
+        self._writer.writerows(
+            [format_timestamp(tx["timestamp"]) if column == "timestamp" else tx[column]
+             for column in CSV_COLUMNS]
+            for tx in transactions)
+
+    def close(self):
+        self._file.close()
+        print(f"{self.count} transactions written to: {self.path}")
+
+
+class StoreSink(TransactionSink):
+    """
+    Upserts the transactions in the local store.
+    """
+
+    def __init__(self, store: TransactionStore):
+        super().__init__()
+        self.store = store
+
+    def _write(self, transactions: list[dict]):
+        self.store.upsert_dictionaries(transactions)
+
+
+def write_pages(pages, sinks: list[TransactionSink]):
+    """
+    Streams pages of transactions to the sinks.
+    Args:
+        pages: An iterable of pages (lists of transaction dictionaries)
+        sinks (list[TransactionSink]): The output sinks
+    Returns:
+        int: The number of transactions written
+    """
+    count = 0
+    for page in pages:
+        for sink in sinks:
+            sink.write(page)
+        count += len(page)
+    return count
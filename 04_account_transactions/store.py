@@ -0,0 +1,220 @@
+"""
+Local store of the account transactions.
+The transactions are kept in an SQLite database indexed by sender, receiver,
+timestamp and token, so new transactions are upserted and queries are
+answered without reading the whole history. The JSON export keeps the format
+of the former transactions.json file.
+"""
+from pathlib import Path
+from threading import Lock
+import json
+import sqlite3
+
+from multiversx_sdk import Address
+
+# Statuses of the transactions not executed yet when they were fetched
+PENDING_STATUSES = ("received", "pending")
+
+
+def parse_transfer(data: str, receiver: str):
+    """
+    Parses the tokens and the effective receiver of an ESDT transfer.
+    A multi-ESDT transfer is sent to the sender itself, its receiver
+    is encoded in the data field.
+    Args:
+        data (str): The data field of the transaction
+        receiver (str): The bech32 address of the transaction receiver
+    Returns:
+        tuple: (receiver bech32 address, list of token IDs)
+    """
+    parts = (data or "").split("@")
+    try:
+        if parts[0] == "ESDTTransfer" and len(parts) > 1:
+            return receiver, [bytes.fromhex(parts[1]).decode()]
+        if parts[0] == "MultiESDTNFTTransfer" and len(parts) > 2:
+            receiver = Address(bytes.fromhex(parts[1]), "erd").to_bech32()
+            count = int(parts[2], 16)
+            # Each transfer is encoded as token@nonce@amount
+            tokens = [bytes.fromhex(parts[3 + 3 * i]).decode() for i in range(count)]
+            return receiver, tokens
+    except (ValueError, IndexError):
+        pass
+    return receiver, []
+
+
+class TransactionStore:
+    """
+    SQLite store of the transactions, keyed by hash.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS transactions (
+                    hash TEXT PRIMARY KEY,
+                    sender TEXT NOT NULL,
+                    receiver TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    status TEXT,
+                    tx_json TEXT NOT NULL
+                )""")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS transaction_tokens (
+                    hash TEXT NOT NULL,
+                    token_id TEXT NOT NULL,
+                    PRIMARY KEY (hash, token_id)
+                )""")
+            for column in ("sender", "receiver", "timestamp"):
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS transactions_{column} "
+                    f"ON transactions ({column})")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS transaction_tokens_token_id "
+                "ON transaction_tokens (token_id)")
+
+    def upsert_dictionaries(self, transactions: list[dict]):
+        """
+        Inserts new transactions and updates the ones already stored, in the
+        format of TransactionOnNetwork.to_dictionary.
+        Args:
+            transactions (list[dict]): The transactions
+        Returns:
+            int: The number of transactions written
+        """
+        rows = []
+        token_rows = []
+        for tx in transactions:
+            receiver, tokens = parse_transfer(tx["data"], tx["receiver"])
+            rows.append((tx["hash"], tx["sender"], receiver, tx["timestamp"],
+                         tx["status"], json.dumps(tx)))
+            token_rows.extend((tx["hash"], token_id) for token_id in tokens)
+        with self._lock, self._connection:
+            self._connection.executemany("""
+                INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET
+                    sender = excluded.sender,
+                    receiver = excluded.receiver,
+                    timestamp = excluded.timestamp,
+                    status = excluded.status,
+                    tx_json = excluded.tx_json""", rows)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO transaction_tokens VALUES (?, ?)", token_rows)
+        return len(rows)
+
+    def import_json(self, path: Path):
+        """
+        Imports the transactions of a JSON file in the export format.
+        Args:
+            path (Path): The JSON file
+        Returns:
+            int: The number of imported transactions
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return self.upsert_dictionaries(json.load(f))
+
+    def get_pending_hashes(self):
+        """
+        Returns the hashes of the stored transactions that were not executed
+        yet when they were fetched.
+        Returns:
+            list[str]: The transaction hashes
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT hash FROM transactions WHERE status IN (?, ?)",
+                PENDING_STATUSES).fetchall()
+        return [tx_hash for tx_hash, in rows]
+
+    def query(self, **filters):
+        """
+        Yields the stored transactions matching the filters, newest first.
+        Args:
+            **filters: The filters of the query_pages method
+        Yields:
+            dict: The transaction, in the format of TransactionOnNetwork.to_dictionary
+        """
+        for page in self.query_pages(**filters):
+            yield from page
+
+    def query_pages(self, sender: str | None = None, receiver: str | None = None,
+                    token_id: str | None = None, after: int | None = None,
+                    before: int | None = None, limit: int | None = None,
+                    page_size: int = 1000):
+        """
+        Yields pages of the stored transactions matching the filters, newest first.
+        Args:
+            sender (str): The bech32 address of the sender
+            receiver (str): The bech32 address of the receiver
+            token_id (str): The ID of a transferred token
+            after (int): Only transactions with a timestamp after this one
+            before (int): Only transactions with a timestamp before this one
+            limit (int): The max number of transactions
+            page_size (int): The number of transactions of a page
+        Yields:
+            list[dict]: The transactions of a page
+        """
+        conditions = []
+        params = []
+        if sender is not None:
+            conditions.append("sender = ?")
+            params.append(sender)
+        if receiver is not None:
+            conditions.append("receiver = ?")
+            params.append(receiver)
+        if token_id is not None:
+            conditions.append(
+                "hash IN (SELECT hash FROM transaction_tokens WHERE token_id = ?)")
+            params.append(token_id)
+        if after is not None:
+            conditions.append("timestamp >= ?")
+            params.append(after)
+        if before is not None:
+            conditions.append("timestamp <= ?")
+            params.append(before)
+
+        sql = "SELECT tx_json FROM transactions"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, hash"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            cursor = self._connection.execute(sql, params)
+            rows = cursor.fetchmany(page_size)
+        while rows:
+            yield [json.loads(tx_json) for tx_json, in rows]
+            with self._lock:
+                rows = cursor.fetchmany(page_size)
+
+    def export_json(self, path: Path, **filters):
+        """
+        Exports the transactions matching the filters to a JSON file,
+        in the format of the former transactions.json file.
+        Args:
+            path (Path): The JSON file
+            **filters: The filters of the query method
+        Returns:
+            int: The number of exported transactions
+        """
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for tx in self.query(**filters):
+                # Same layout as json.dump(transactions, f, indent=4)
+                f.write(",\n" if count else "[\n")
+                f.write("    " + json.dumps(tx, indent=4).replace("\n", "\n    "))
+                count += 1
+            f.write("\n]" if count else "[]")
+        return count
+
+    def close(self):
+        """
+        Closes the store database.
+        """
+        with self._lock:
+            self._connection.close()
@@ -1,14 +1,29 @@
 """
 This script claims tokens from the token manager smart contract
 for all the account wallets found in the specified path.
+In batch mode the claim transactions of all the accounts are signed
+in parallel, sent in batches and tracked until they are executed.
 """
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from threading import Lock
+import os
+import sys
+import time
 
 from multiversx_sdk import (
-    Address, UserWallet, ProxyNetworkProvider,
-    TransactionComputer, UserSigner, AccountNonceHolder,
+    Address, ProxyNetworkProvider,
+    Transaction, TransactionComputer, UserSigner,
     TransactionsFactoryConfig, SmartContractTransactionsFactory
 )
+from multiversx_sdk.network_providers.transactions import TransactionOnNetwork
+
+sys.path.append(str(Path(__file__).parent.parent))
+from common.accounts import Account, load_accounts  # noqa: E402
+from common.batches import send_and_track, sign_transactions  # noqa: E402
+from common.nonces import get_nonce_manager  # noqa: E402
+from common.tracker import TransactionTracker  # noqa: E402
 
 CHAIN = "D"
 GATEWAY = "https://devnet-gateway.multiversx.com"
@@ -23,6 +38,12 @@ FUNCTION_NAME = "claim_tokens"
 CLAIM_AMOUNT = 100
 TOKEN_ID = "SNOW-1a790f"
 TOKEN_DECIMALS = 8
+GAS_LIMIT = 10000000
+
+BATCH_MODE = True  # Sign, send and track the claims of all the accounts together
+CLAIMS_PER_ACCOUNT = 1  # Number of claim transactions sent by each account
+TRANSACTIONS_BATCH_SIZE = 100  # Number of claim transactions in each send request
+SIGNING_WORKERS = os.cpu_count() or 1  # Number of accounts prepared in parallel
 
 
 def read_accounts_password():
@@ -47,6 +68,28 @@ def get_accounts():
     return accounts
 
 
+def build_claim_transaction(factory: SmartContractTransactionsFactory,
+                            sender: Address):
+    """
+    Creates the claim transaction of an account, without its nonce and signature.
+    Args:
+        factory (SmartContractTransactionsFactory): The transactions factory
+        sender (Address): The address of the account claiming the tokens
+    Returns:
+        Transaction: The call of the claim_tokens function
+    """
+    return factory.create_transaction_for_execute(
+        sender=sender,
+        contract=Address.from_bech32(SC_ADDRESS),
+        function=FUNCTION_NAME,
+        gas_limit=GAS_LIMIT,
+        arguments=[
+            TOKEN_ID,
+            CLAIM_AMOUNT * 10**TOKEN_DECIMALS
+        ]
+    )
+
+
 def claim_tokens_for_account(account_address: Address, signer: UserSigner):
     """
     Claims tokens from the token manager smart contract.
@@ -58,30 +101,136 @@ def claim_tokens_for_account(account_address: Address, signer: UserSigner):
         TransactionsFactoryConfig(CHAIN)
     )
     # Create a transaction to call the claim_tokens function
-    tx = tx_factory.create_transaction_for_execute(
-        sender=account_address,
-        contract=Address.from_bech32(SC_ADDRESS),
-        function=FUNCTION_NAME,
-        gas_limit=10000000,
-        arguments=[
-            TOKEN_ID,
-            CLAIM_AMOUNT * 10**TOKEN_DECIMALS
-        ]
-    )
+    tx = build_claim_transaction(tx_factory, account_address)
     # get the nonce
-    account_on_network = PROXY.get_account(account_address)
-    nonce_holder = AccountNonceHolder(account_on_network.nonce)
-    tx.nonce = nonce_holder.get_nonce_then_increment()
+    nonce_manager = get_nonce_manager(account_address, PROXY)
+    tx.nonce = nonce_manager.get_nonce_then_increment()
     # sign the transaction
     computer = TransactionComputer()
     bytes_to_sign = computer.compute_bytes_for_signing(tx)
     tx.signature = signer.sign(bytes_to_sign)
     # send the transaction
     print("Sending claim transaction...")
-    tx_hash = PROXY.send_transaction(tx)
+    try:
+        tx_hash = PROXY.send_transaction(tx)
+    except Exception:
+        nonce_manager.release([tx.nonce])
+        raise
     print(f"Transaction hash: {tx_hash}")
 
 
+class ClaimResults:
+    """
+    Outcomes of the claim transactions, per account.
+    Updated from the tracker threads.
+    """
+
+    def __init__(self):
+        self.accounts: dict[str, dict[str, int]] = {}
+        self._lock = Lock()
+
+    def add(self, address: str, outcome: str):
+        """
+        Counts a claim outcome of an account.
+        Args:
+            address (str): The bech32 address of the account
+            outcome (str): "successful", "failed", "rejected" or "not finalized"
+        """
+        with self._lock:
+            counts = self.accounts.setdefault(address, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def count(self, outcome: str):
+        """
+        Returns the number of claims with an outcome, over all the accounts.
+        Args:
+            outcome (str): The claim outcome
+        Returns:
+            int: The number of claims
+        """
+        with self._lock:
+            return sum(counts.get(outcome, 0) for counts in self.accounts.values())
+
+    def report(self):
+        """
+        Prints the claim outcomes of each account.
+        """
+        with self._lock:
+            for address, counts in sorted(self.accounts.items()):
+                outcomes = ", ".join(f"{outcome}: {count}"
+                                     for outcome, count in sorted(counts.items()))
+                print(f"{address}: {counts.get('successful', 0)} / "
+                      f"{sum(counts.values())} claims successful ({outcomes})")
+
+
+def process_claim_result(results: ClaimResults, tx_hash: str, address: str,
+                         future: Future):
+    """
+    Records the outcome of a tracked claim transaction.
+    Called by the tracker once the transaction is finalized.
+    Args:
+        results (ClaimResults): The claim outcomes
+        tx_hash (str): The transaction hash
+        address (str): The bech32 address of the claiming account
+        future (Future): The tracker future of the transaction
+    """
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        print(f"Error: {str(future.exception())}")
+        results.add(address, "not finalized")
+        return
+
+    tx_on_network: TransactionOnNetwork = future.result()
+    if tx_on_network.status.is_successful():
+        results.add(address, "successful")
+    else:
+        print(f"Claim transaction {tx_hash} failed: {tx_on_network.status}")
+        results.add(address, "failed")
+
+
+def claim_tokens(accounts: list[Account]):
+    """
+    Claims tokens for all the accounts in batch mode.
+    The factory is created once, the nonces are reserved and the transactions
+    signed for all the accounts in parallel, then the transactions are sent
+    in batches and tracked together until they are executed.
+    Args:
+        accounts (list[Account]): The claiming accounts
+    """
+    factory = SmartContractTransactionsFactory(TransactionsFactoryConfig(CHAIN))
+    build_transaction = partial(build_claim_transaction, factory)
+    transactions: list[Transaction] = []
+    with ThreadPoolExecutor(max_workers=SIGNING_WORKERS) as executor:
+        futures = {executor.submit(sign_transactions, account, CLAIMS_PER_ACCOUNT,
+                                   build_transaction, PROXY): account
+                   for account in accounts}
+        for future, account in futures.items():
+            try:
+                transactions.extend(future.result())
+            except Exception as e:
+                print(f"Error for address {account.address.to_bech32()}: {str(e)}")
+
+    results = ClaimResults()
+    start_time = time.perf_counter()
+    with TransactionTracker(PROXY) as tracker:
+        futures = send_and_track(
+            transactions, accounts, PROXY, tracker, TRANSACTIONS_BATCH_SIZE,
+            partial(process_claim_result, results), "claim",
+            on_rejected=partial(results.add, outcome="rejected"))
+        print(f"\nWaiting for {len(futures)} claim transactions...")
+        tracker.wait_all(futures)
+    elapsed = time.perf_counter() - start_time
+
+    print("\nClaims per account:")
+    results.report()
+    successful = results.count("successful")
+    print(f"\n{successful} / {len(transactions)} claims successful in {elapsed:.2f}s "
+          f"({successful / elapsed:.1f} claims/s, {results.count('failed')} failed, "
+          f"{results.count('rejected')} rejected, "
+          f"{results.count('not finalized')} not finalized)")
+
+
 def main():
     """
     Main entry point of the script.
@@ -94,15 +243,15 @@ def main():
         print("No accounts found. Run the generate_accounts script first.")
         return
 
+    if BATCH_MODE:
+        claim_tokens(load_accounts(accounts, password))
+        return
+
     # Get all account wallets
-    for account_json in accounts:
-        user_secret_key = UserWallet.load_secret_key(
-            Path(account_json), password)
-        account_address = user_secret_key.generate_public_key().to_address()
-        signer = UserSigner.from_wallet(Path(account_json), password)
+    for account in load_accounts(accounts, password):
         # Claim tokens for each account
-        print(f"\nProcessing account: {account_address.to_bech32()}")
-        claim_tokens_for_account(account_address, signer)
+        print(f"\nProcessing account: {account.address.to_bech32()}")
+        claim_tokens_for_account(account.address, account.signer)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+'''
+Compact columnar cache of the token holders.
+The holders are stored as two fixed-width columns, the 32-byte public keys of
+the addresses and the balances as 32-byte big-endian integers, followed by a
+dictionary of the tokens with the range of holders of each token. The file is
+memory-mapped when it is read, and the addresses are only encoded to bech32
+for the holders that are used.
+'''
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+import base64
+import heapq
+import mmap
+import os
+import shutil
+import struct
+
+from multiversx_sdk import Address
+from classes import TokenHolder
+
+MAGIC = b'WCCH'
+VERSION = 2
+# Magic, version, number of holders, offset of the tokens dictionary
+HEADER = struct.Struct('<4sHQQ')
+# Start and number of holders of a token, then the lengths of its ID and name
+TOKEN_ENTRY = struct.Struct('<QQHH')
+PUBKEY_SIZE = 32
+# Balances are unsigned 256-bit integers, like the biggest ESDT supplies
+BALANCE_SIZE = 32
+# Balance width of each version, version 1 files have 128-bit balances
+BALANCE_SIZES = {1: 16, 2: BALANCE_SIZE}
+# Maps the bech32 characters to the base32 ones with the same 5-bit values
+BECH32_TO_BASE32 = str.maketrans('qpzry9x8gf2tvdw0s3jn54khce6mua7l', 'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567')
+BECH32_ADDRESS_LENGTH = 62
+
+
+def bech32_to_public_key(address: str) -> bytes:
+    '''
+    Decodes the public key of a bech32 address.
+    The 52 data characters of an erd1 address are decoded as base32, much faster
+    than the SDK decoder. The addresses are the ones returned by the API, their
+    checksum is not verified.
+    '''
+    if len(address) != BECH32_ADDRESS_LENGTH or not address.startswith('erd1'):
+        return Address.new_from_bech32(address).get_public_key()
+    return base64.b32decode(address[4:56].translate(BECH32_TO_BASE32) + '====')[:PUBKEY_SIZE]
+
+
+def write_holders_cache(path: Path, token_holders: Iterable[TokenHolder]) -> Iterator[TokenHolder]:
+    '''
+    Writes the token holders to the cache file as they pass through.
+    The holders of a token are expected one after the other. The cache file
+    is replaced once all the holders are written, the temporary files are
+    removed if the writing fails.
+    '''
+    temp_file = path.with_suffix('.tmp')
+    balances_file = path.with_suffix('.balances.tmp')
+    tokens: List[Tuple[str, str, int, int]] = []
+    count = 0
+    try:
+        with open(temp_file, 'wb') as f, open(balances_file, 'w+b') as balances:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+            for holder in token_holders:
+                if not tokens or tokens[-1][0] != holder.token_id:
+                    tokens.append((holder.token_id, holder.token_name, count, 0))
+                f.write(bech32_to_public_key(holder.address))
+                balances.write(int(holder.balance).to_bytes(BALANCE_SIZE, 'big'))
+                token_id, token_name, start, token_count = tokens[-1]
+                tokens[-1] = (token_id, token_name, start, token_count + 1)
+                count += 1
+                yield holder
+
+            # The balances column follows the public keys column
+            balances.seek(0)
+            shutil.copyfileobj(balances, f)
+            tokens_offset = f.tell()
+            f.write(struct.pack('<I', len(tokens)))
+            for token_id, token_name, start, token_count in tokens:
+                token_id_bytes = token_id.encode()
+                token_name_bytes = token_name.encode()
+                f.write(TOKEN_ENTRY.pack(start, token_count, len(token_id_bytes), len(token_name_bytes)))
+                f.write(token_id_bytes + token_name_bytes)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, count, tokens_offset))
+        os.replace(temp_file, path)
+    finally:
+        balances_file.unlink(missing_ok=True)
+        temp_file.unlink(missing_ok=True)
+
+
+class HoldersCacheReader:
+    '''
+    Memory-mapped holders cache file.
+    '''
+
+    def __init__(self, path: Path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.holders_count, tokens_offset = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version not in BALANCE_SIZES:
+            self._mmap.close()
+            raise ValueError(f"Unsupported holders cache file: {path}")
+        self._balance_size = BALANCE_SIZES[version]
+        self._balances_offset = HEADER.size + self.holders_count * PUBKEY_SIZE
+
+        # (token ID, token name, first holder, number of holders) of each token
+        self.tokens: List[Tuple[str, str, int, int]] = []
+        offset = tokens_offset
+        tokens_count, = struct.unpack_from('<I', self._mmap, offset)
+        offset += 4
+        for _ in range(tokens_count):
+            start, count, token_id_size, token_name_size = TOKEN_ENTRY.unpack_from(self._mmap, offset)
+            offset += TOKEN_ENTRY.size
+            token_id = self._mmap[offset:offset + token_id_size].decode()
+            offset += token_id_size
+            token_name = self._mmap[offset:offset + token_name_size].decode()
+            offset += token_name_size
+            self.tokens.append((token_id, token_name, start, count))
+
+    def get_public_key(self, index: int) -> bytes:
+        offset = HEADER.size + index * PUBKEY_SIZE
+        return self._mmap[offset:offset + PUBKEY_SIZE]
+
+    def _get_balance_bytes(self, index: int) -> bytes:
+        offset = self._balances_offset + index * self._balance_size
+        return self._mmap[offset:offset + self._balance_size]
+
+    def get_holder(self, token_id: str, token_name: str, index: int) -> TokenHolder:
+        '''
+        Returns a holder, encoding its address to bech32.
+        '''
+        address = Address(self.get_public_key(index), 'erd').to_bech32()
+        balance = int.from_bytes(self._get_balance_bytes(index), 'big')
+        return TokenHolder(token_id, token_name, address, str(balance))
+
+    def get_top_holders(self, token_id: str, token_name: str, start: int, count: int, size: int) -> List[TokenHolder]:
+        '''
+        Returns the holders of a token with the largest balances, in descending balance order.
+        The big-endian balances compare as bytes, only the top holders are decoded.
+        '''
+        indexes = heapq.nlargest(size, range(start, start + count), key=self._get_balance_bytes)
+        return [self.get_holder(token_id, token_name, index) for index in indexes]
+
+    def close(self):
+        self._mmap.close()
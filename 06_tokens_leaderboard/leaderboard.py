@@ -3,13 +3,22 @@ This script generates a leaderboard of token holders for a given token ID.
 It uses the MultiversX API to retrieve token information and token holders.
 The leaderboard is saved to a file for later use.
 '''
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 import json
 from classes import TokenHolder
+from holders_cache import HoldersCacheReader, write_holders_cache
+from ranking import Leaderboard
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from multiversx_sdk import ApiNetworkProvider
 
+from multiversx_sdk.network_providers.errors import GenericError
 from multiversx_sdk.network_providers.interface import IPagination
 from multiversx_sdk.network_providers.api_network_provider import (
     DefaultPagination
@@ -20,87 +29,208 @@ TOKEN_DECIMALS = 8
 API_URL = "https://devnet-api.multiversx.com"
 BATCH_SIZE = 1000  # Number of items to fetch in each api request batch
 # Cache data for large datasets to use in output formatting
-HOLDERS_DATA_CACHE = Path(__file__).parent / "holders_data_cache.json"
+HOLDERS_DATA_CACHE = Path(__file__).parent / "holders_data_cache.bin"
+# Cache of the discovered tokens, refreshed when new tokens are found
+TOKENS_CACHE = Path(__file__).parent / "tokens_cache.json"
 # Leaderboard output file
 LEADERBOARD_OUTPUT = Path(__file__).parent / "leaderboard_output.txt"
 # Number of top holders to display
 DISPLAY_TOP_HOLDERS = 5
+# Number of top holdings across all tokens to display, 0 to disable
+GLOBAL_TOP_HOLDERS = 10
 # Number of tokens to display in each batch for console output
 DISPLAY_TOKENS_BATCH = 20
+# Number of concurrent API requests, shared by all the tokens and pages
+API_WORKERS = 8
+# Number of retries of a throttled or failed API request, with exponential backoff
+API_RETRIES = 5
+
+
+def create_api_session() -> requests.Session:
+    '''
+    Creates an HTTP session with a connection pool sized for the API workers,
+    retrying throttled and failed requests with exponential backoff.
+    '''
+    retry = Retry(total=API_RETRIES, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=API_WORKERS, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class ApiProviderExtension(ApiNetworkProvider):
     # Extend the ApiNetworkProvider SDK class with additional methods for tokens
 
-    # Get all fungible tokens
-    def get_fungible_tokens_all(self, pagination: IPagination = DefaultPagination()) -> List[Dict[str, Any]]:
-        url = f'/tokens?type=FungibleESDT&fields=identifier,name,ticker&{self._build_pagination_params(pagination)}'
+    def __init__(self, url: str, session: requests.Session | None = None):
+        super().__init__(url)
+        # Keep-alive connections shared by all the requests of the provider
+        self.session = session or create_api_session()
+
+    def do_get_generic_value(self, resource_url: str) -> Any:
+        url = f'{self.url}/{resource_url}'
+        try:
+            response = self.session.get(url, auth=self.auth, **self.config.requests_options)
+            response.raise_for_status()
+            return response.json()
+        except requests.HTTPError as err:
+            raise GenericError(url, self._extract_error_from_response(err.response))
+        except Exception as err:
+            raise GenericError(url, err)
+
+    def do_get_generic_collection(self, resource_url: str) -> List[Dict[str, Any]]:
+        return self._get_data(self.do_get_generic_value(resource_url), f'{self.url}/{resource_url}')
+
+    # Get the fungible tokens matching a search, filtered by the API
+    def get_fungible_tokens(self, search: str, pagination: IPagination = DefaultPagination()) -> List[Dict[str, Any]]:
+        url = f'/tokens?type=FungibleESDT&search={search}&fields=identifier,name,ticker,accounts,timestamp&{self._build_pagination_params(pagination)}'
         return self.do_get_generic_collection(url)
 
+    # Count the fungible tokens matching a search
+    def get_fungible_tokens_count(self, search: str) -> int:
+        return int(self.do_get_generic_value(f'/tokens/count?type=FungibleESDT&search={search}'))
+
     # Get token accounts
     def get_fungible_token_accounts(self, token_id, pagination: IPagination = DefaultPagination()) -> List[Dict[str, Any]]:
         url = f'/tokens/{token_id}/accounts?{self._build_pagination_params(pagination)}'
         return self.do_get_generic_collection(url)
 
 
-def get_tokens_with_id_from_api(token_id) -> List[Dict[str, Any]]:
+API_PROVIDER = ApiProviderExtension(API_URL)
+
+
+def get_tokens_page(token_id, start) -> List[Dict[str, Any]]:
     '''
-    Retrieves a list of tokens with the specified identifier from the API.
+    Retrieves a page of the tokens matching the specified identifier from the API.
     '''
-    api_provider = ApiProviderExtension(API_URL)
     pagination = DefaultPagination()
     pagination.size = BATCH_SIZE
-    pagination.start = 0
-    all_tokens = []
-    while token_batch := api_provider.get_fungible_tokens_all(pagination):
-        if token_batch is None:
-            break
-        all_tokens.extend(token_batch)
-        pagination.start += pagination.size
+    pagination.start = start
+    return API_PROVIDER.get_fungible_tokens(token_id, pagination) or []
+
 
+def load_tokens_cache() -> Dict[str, Any] | None:
+    '''
+    Loads the cached token discovery list, if any.
+    '''
+    if not TOKENS_CACHE.exists():
+        return None
+    try:
+        with open(TOKENS_CACHE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading tokens cache: {str(e)}")
+        return None
+
+
+def save_tokens_cache(token_id, count, tokens: List[Dict[str, Any]]):
+    '''
+    Saves the token discovery list and the matching tokens count of the API.
+    '''
+    with open(TOKENS_CACHE, "w", encoding="utf-8") as f:
+        json.dump({'search': token_id, 'count': count, 'tokens': tokens}, f, indent=4)
+
+
+def get_tokens_with_id_from_api(token_id) -> List[Dict[str, Any]]:
+    '''
+    Retrieves a list of tokens with the specified identifier from the API.
+    The API filters the fungible tokens by the identifier, and the pages are
+    planned from the tokens count and fetched in parallel. The cached list is
+    used as long as the API counts the same number of matching tokens.
+    '''
+    count = API_PROVIDER.get_fungible_tokens_count(token_id)
+    cache = load_tokens_cache()
+    if cache and cache.get('search') == token_id and cache.get('count') == count:
+        print(f"\nUsing the cached list of {len(cache['tokens'])} tokens, no new tokens since the last run")
+        return cache['tokens']
+
+    with ThreadPoolExecutor(max_workers=API_WORKERS) as executor:
+        pages = executor.map(partial(get_tokens_page, token_id), range(0, count, BATCH_SIZE))
+        all_tokens = [token for page in pages for token in page]
+
+    # The search also matches the token names, keep the identifier prefix only
     tokens_with_id = [token for token in all_tokens if token.get('identifier').startswith(token_id)]
+    if cache and cache.get('search') == token_id:
+        known = {token['identifier'] for token in cache['tokens']}
+        print(f"New tokens since the last run: {sum(1 for token in tokens_with_id if token['identifier'] not in known)}")
 
+    save_tokens_cache(token_id, count, tokens_with_id)
     return tokens_with_id
 
 
-def get_token_holders_from_api(token_id) -> List[Dict[str, Any]]:
+def get_token_holders_page(token_id, start) -> List[Dict[str, Any]]:
     '''
-    Retrieves a list of token holders for the specified token ID from the API.
+    Retrieves a page of token holders for the specified token ID from the API.
     '''
-    api_provider = ApiProviderExtension(API_URL)
     pagination = DefaultPagination()
     pagination.size = BATCH_SIZE
-    pagination.start = 0
-    token_holders = []
-    while token_batch := api_provider.get_fungible_token_accounts(token_id, pagination):
-        if token_batch is None:
-            break
-        token_holders.extend(token_batch)
-        pagination.start += pagination.size
-    return token_holders
+    pagination.start = start
+    return API_PROVIDER.get_fungible_token_accounts(token_id, pagination) or []
 
 
-def get_holders_data_from_api() -> List[TokenHolder]:
+def get_tokens_holders_from_api(tokens) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    '''
+    Retrieves the holders of the tokens, yielded page by page in token order.
+    The pages of all the tokens are planned from the holder counts of the
+    token list and fetched concurrently by the API workers, a bounded number
+    of pages ahead of the consumer. The holder count of each token is updated
+    once all its pages are retrieved.
     '''
-    Retrieves the list of token holders from the API.
+    # Each page is (token index, start), at least one page per token
+    planned_pages = iter([(token_index, start)
+                          for token_index, token in enumerate(tokens)
+                          for start in range(0, max(token.get('accounts') or 0, 1), BATCH_SIZE)])
+    with ThreadPoolExecutor(max_workers=API_WORKERS) as executor:
+        pending = deque()
+        for token_index, token in enumerate(tokens):
+            fetched = 0
+            page_size = 0
+            while True:
+                # Keep a bounded number of pages in flight
+                for page_token_index, start in planned_pages:
+                    pending.append((page_token_index, executor.submit(
+                        get_token_holders_page, tokens[page_token_index]['identifier'], start)))
+                    if len(pending) >= API_WORKERS * 4:
+                        break
+                if not pending or pending[0][0] != token_index:
+                    break
+                page = pending.popleft()[1].result()
+                fetched += len(page)
+                page_size = len(page)
+                yield token, page
+
+            # The holder counts of the token list can be behind,
+            # a full last page is followed by the remaining pages
+            while page_size == BATCH_SIZE:
+                page = get_token_holders_page(token['identifier'], fetched)
+                fetched += len(page)
+                page_size = len(page)
+                yield token, page
+
+            print(f"{token_index + 1}/{len(tokens)} Token ID: {token.get('identifier')}, Name: {token.get('name')}, Ticker: {token.get('ticker')} Token holders: {fetched}")
+            token['accounts'] = fetched
+
+
+def get_holders_data_from_api() -> Iterator[TokenHolder]:
+    '''
+    Retrieves the token holders from the API, yielded as the pages are retrieved.
     '''
     tokens = get_tokens_with_id_from_api(TOKEN_ID_NAME)
     print(f"\nFound {len(tokens)} tokens with identifier '{TOKEN_ID_NAME}'")
-    token_holders = []
-    for token in tokens:
+    for token, page in get_tokens_holders_from_api(tokens):
         token_id = token.get('identifier')
         token_name = token.get('name')
-        token_ticker = token.get('ticker')
-
-        holders = get_token_holders_from_api(token_id)
-        print(f"{tokens.index(token) + 1}/{len(tokens)} Token ID: {token_id}, Name: {token_name}, Ticker: {token_ticker} Token holders: {len(holders)}")
-
-        for holder in holders:
+        for holder in page:
             holder_address = holder.get('address')
             balance = holder.get('balance')
-            token_holders.append(TokenHolder(token_id, token_name, holder_address, balance))
+            yield TokenHolder(token_id, token_name, holder_address, balance)
 
-    return token_holders
+    # The holder counts of the cached token list plan the pages of the next run
+    cache = load_tokens_cache()
+    if cache:
+        save_tokens_cache(cache['search'], cache['count'], tokens)
 
 
 def format_balance(balance: int) -> str:
@@ -113,52 +243,43 @@ def format_balance(balance: int) -> str:
     return f"{decimal_balance:,.{TOKEN_DECIMALS}f}"
 
 
-def generate_leaderboard(token_holders):
+def format_holders_table(header, subheader, holders: List[TokenHolder], with_token=False) -> List[str]:
     '''
-    Generates the leaderboard from the list of token holders.
+    Formats a table of ranked holders.
+    '''
+    separator = "-" * 112
+    table_header = f"{'Rank':<4} | {'Address':<62} | {'Balance':<30}"
+    lines = [header, subheader, separator, table_header, separator]
+    for rank, holder in enumerate(holders, 1):
+        formatted_balance = format_balance(holder.balance)
+        lines.append(f"{rank:<4} | {holder.address:<62} | {formatted_balance:>40}")
+        if with_token:
+            lines.append(f"{'':<4} | Token ID: {holder.token_id} Name: {holder.token_name}")
+    lines.append(separator)
+    return lines
+
+
+def generate_leaderboard(leaderboard: Leaderboard):
+    '''
+    Generates the leaderboard output from the ranked token holders.
     '''
-    # Group holders by token_id
-    token_groups = {}
-    for holder in token_holders:
-        if holder.token_id not in token_groups:
-            token_groups[holder.token_id] = []
-        token_groups[holder.token_id].append(holder)
-
     # Sort tokens by number of holders in descending order, then by token name
-    sorted_tokens = sorted(
-        token_groups.items(),
-        key=lambda x: (-len(x[1]), x[1][0].token_name)  # Sort by -holder_count (desc), then token_name (asc)
-    )
+    sorted_tokens = leaderboard.get_sorted_tokens()
     total_tokens = len(sorted_tokens)
 
     display_batch = 0
     output = []
 
-    # For each token, sort holders and displays the top number of holders configured in DISPLAY_TOP_HOLDERS
-    for token_index, (token_id, holders) in enumerate(sorted_tokens, 1):
+    # For each token, display the top number of holders configured in DISPLAY_TOP_HOLDERS
+    for token_index, ranking in enumerate(sorted_tokens, 1):
         if display_batch == 0:
             display_batch = DISPLAY_TOKENS_BATCH
             input(f"\nPress any key to display next {display_batch} tokens...")
 
-        # Sort holders by amount in descending order
-        sorted_holders = sorted(holders, key=lambda x: int(x.balance), reverse=True)
-        top_holders = sorted_holders[:DISPLAY_TOP_HOLDERS]
-        total_holders = len(sorted_holders)
-        actual_holders_count = len(top_holders)
-
-        header = f"\nToken {token_index}/{total_tokens}: Top {actual_holders_count} out of {total_holders:,} holders"
-        subheader = f"Token ID: {token_id} Name: {holders[0].token_name}"
-        separator = "-" * 112
-        table_header = f"{'Rank':<4} | {'Address':<62} | {'Balance':<30}"
-
-        # Calculate the number of lines in this token's display
-        display_lines = [header, subheader, separator, table_header, separator]
-        # Add the top holders
-        for rank, holder in enumerate(top_holders, 1):
-            formatted_balance = format_balance(holder.balance)
-            line = f"{rank:<4} | {holder.address:<62} | {formatted_balance:>40}"
-            display_lines.append(line)
-        display_lines.append(separator)
+        top_holders = ranking.top_holders.top()
+        header = f"\nToken {token_index}/{total_tokens}: Top {len(top_holders)} out of {ranking.holders_count:,} holders"
+        subheader = f"Token ID: {ranking.token_id} Name: {ranking.token_name}"
+        display_lines = format_holders_table(header, subheader, top_holders)
         # Add to the output
         output.extend(display_lines)
 
@@ -168,37 +289,65 @@ def generate_leaderboard(token_holders):
 
         display_batch -= 1
 
+    # Top holdings across all the tokens
+    global_top = leaderboard.get_global_top()
+    if global_top:
+        display_lines = format_holders_table(
+            f"\nAll tokens: Top {len(global_top)} holdings",
+            f"Token ID prefix: {TOKEN_ID_NAME}", global_top, with_token=True)
+        output.extend(display_lines)
+        for line in display_lines:
+            print(line)
+
     return output
 
 
-def save_holders_to_cache(token_holders: List[TokenHolder]):
+def save_holders_to_cache(token_holders: Iterable[TokenHolder]) -> Iterator[TokenHolder]:
+    '''
+    Writes the token holders to the cache file as they pass through.
+    '''
+    return write_holders_cache(HOLDERS_DATA_CACHE, token_holders)
+
+
+def rank_holders(token_holders: Iterable[TokenHolder]) -> Leaderboard:
     '''
-    Saves the list of token holders to the cache file.
+    Ranks the token holders as they are read, keeping only the top holders of each token.
     '''
-    with open(HOLDERS_DATA_CACHE, "w", encoding="utf-8") as f:
-        json.dump([holder.to_dict() for holder in token_holders], f, indent=4)
+    leaderboard = Leaderboard(DISPLAY_TOP_HOLDERS, GLOBAL_TOP_HOLDERS)
+    leaderboard.add_all(token_holders)
+    return leaderboard
 
 
-def load_holders_from_cache() -> List[TokenHolder]:
+def load_leaderboard_from_cache() -> Leaderboard:
     '''
-    Loads the list of token holders from the cache file.
+    Ranks the token holders of the memory-mapped cache file.
+    Only the top holders of each token are read from the balances column and decoded.
     '''
-    with open(HOLDERS_DATA_CACHE, "r", encoding="utf-8") as f:
-        return [TokenHolder.from_dict(data) for data in json.load(f)]
+    leaderboard = Leaderboard(DISPLAY_TOP_HOLDERS, GLOBAL_TOP_HOLDERS)
+    # The global top holdings are among the top holders of their tokens
+    top_size = max(DISPLAY_TOP_HOLDERS, GLOBAL_TOP_HOLDERS)
+    reader = HoldersCacheReader(HOLDERS_DATA_CACHE)
+    try:
+        for token_id, token_name, start, count in reader.tokens:
+            top_holders = reader.get_top_holders(token_id, token_name, start, count, top_size)
+            leaderboard.add_ranked(token_id, token_name, count, top_holders)
+    finally:
+        reader.close()
+    return leaderboard
 
 
 def main():
     if (Path(HOLDERS_DATA_CACHE).exists() and
             input("\nFound token holders data cache file. Press 'y' to use it, or any other key to get new data from API...") == "y"):
         print("\nReading token holders data from cache...")
-        token_holders = load_holders_from_cache()
+        leaderboard = load_leaderboard_from_cache()
     else:
         print("\nReading token holders data from API...")
-        token_holders = get_holders_data_from_api()
-        save_holders_to_cache(token_holders)
+        # The holders stream from the API pages to the cache file and the ranking
+        leaderboard = rank_holders(save_holders_to_cache(get_holders_data_from_api()))
         print(f"\nToken holders saved to: {HOLDERS_DATA_CACHE}")
 
-    output = generate_leaderboard(token_holders)
+    output = generate_leaderboard(leaderboard)
 
     # Save to file
     with open(LEADERBOARD_OUTPUT, "w", encoding="utf-8") as f:
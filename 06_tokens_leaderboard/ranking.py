@@ -0,0 +1,105 @@
+'''
+Top-K ranking of token holders.
+The holders stream in one at a time and only the top holders of each token
+are kept, in bounded min-heaps, together with the holder counts. The balances
+are parsed once, when a holder is added.
+'''
+from typing import Dict, Iterable, List, Tuple
+import heapq
+from classes import TokenHolder
+
+
+class TopHolders:
+    # Bounded min-heap of the holders with the largest balances
+
+    def __init__(self, size: int):
+        self.size = size
+        # (balance, -arrival order, holder), the smallest entry is dropped first,
+        # so holders with equal balances keep their arrival order
+        self._heap: List[Tuple[int, int, TokenHolder]] = []
+        self._counter = 0
+
+    def add(self, balance: int, holder: TokenHolder):
+        heap = self._heap
+        if len(heap) < self.size:
+            self._counter += 1
+            heapq.heappush(heap, (balance, -self._counter, holder))
+        elif balance > heap[0][0]:
+            # A later holder with an equal balance ranks below, it never enters a full heap
+            self._counter += 1
+            heapq.heapreplace(heap, (balance, -self._counter, holder))
+
+    def top(self) -> List[TokenHolder]:
+        # Holders in descending balance order
+        return [holder for _, _, holder in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+class TokenRanking:
+    # Holder count and top holders of a token
+
+    def __init__(self, token_id: str, token_name: str, top_size: int):
+        self.token_id = token_id
+        self.token_name = token_name
+        self.holders_count = 0
+        self.top_holders = TopHolders(top_size)
+
+
+class Leaderboard:
+    '''
+    Ranks the holders of all the tokens as they are added, keeping the top
+    holders of each token and the top holdings across all the tokens.
+    '''
+
+    def __init__(self, top_size: int, global_top_size: int = 0):
+        self.top_size = top_size
+        self.tokens: Dict[str, TokenRanking] = {}
+        self.global_top = TopHolders(global_top_size) if global_top_size > 0 else None
+
+    def add(self, holder: TokenHolder):
+        '''
+        Adds a holder to the ranking of its token.
+        '''
+        ranking = self.tokens.get(holder.token_id)
+        if ranking is None:
+            ranking = TokenRanking(holder.token_id, holder.token_name, self.top_size)
+            self.tokens[holder.token_id] = ranking
+        balance = int(holder.balance)
+        ranking.holders_count += 1
+        ranking.top_holders.add(balance, holder)
+        if self.global_top is not None:
+            self.global_top.add(balance, holder)
+
+    def add_ranked(self, token_id: str, token_name: str, holders_count: int, top_holders: Iterable[TokenHolder]):
+        '''
+        Adds the holder count of a token and its holders with the largest balances,
+        ranked elsewhere. The top holders must include the ones of the rankings.
+        '''
+        ranking = self.tokens.get(token_id)
+        if ranking is None:
+            ranking = TokenRanking(token_id, token_name, self.top_size)
+            self.tokens[token_id] = ranking
+        ranking.holders_count += holders_count
+        for holder in top_holders:
+            balance = int(holder.balance)
+            ranking.top_holders.add(balance, holder)
+            if self.global_top is not None:
+                self.global_top.add(balance, holder)
+
+    def add_all(self, holders: Iterable[TokenHolder]):
+        '''
+        Adds the holders one at a time.
+        '''
+        for holder in holders:
+            self.add(holder)
+
+    def get_sorted_tokens(self) -> List[TokenRanking]:
+        '''
+        Returns the token rankings sorted by number of holders in descending order, then by token name.
+        '''
+        return sorted(self.tokens.values(), key=lambda ranking: (-ranking.holders_count, ranking.token_name))
+
+    def get_global_top(self) -> List[TokenHolder]:
+        '''
+        Returns the top holdings across all the tokens, in descending balance order.
+        '''
+        return self.global_top.top() if self.global_top is not None else []
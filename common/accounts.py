@@ -0,0 +1,128 @@
+"""
+Loads the wallet accounts generated in step 01.
+Each keystore is decrypted once per process, and the address and the signer
+are derived from the same secret key. Unlocked accounts are kept in an
+in-memory keyring, so steps running in the same process reuse them.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from threading import Lock
+import os
+
+from multiversx_sdk import UserSecretKey, UserSigner, UserWallet
+
+ROOT_PATH = Path(__file__).parent.parent
+PASSFILE_PATH = ROOT_PATH / "wallets_password.txt"
+ACC_JSON_PATH = ROOT_PATH / "_accounts/json"
+WORKERS = os.cpu_count() or 1  # Number of processes decrypting keystores
+
+
+class Account:
+    def __init__(self, json_path: Path, secret_key: UserSecretKey):
+        self.json_path = json_path
+        self.secret_key = secret_key
+        self.address = secret_key.generate_public_key().to_address()
+        self.signer = UserSigner(secret_key)
+
+    def __repr__(self) -> str:
+        return f"Account(address='{self.address.to_bech32()}', json_path='{self.json_path}')"
+
+
+class Keyring:
+    """
+    In-memory keyring of unlocked accounts, keyed by keystore path.
+    """
+
+    def __init__(self):
+        self._accounts: dict[Path, Account] = {}
+        self._lock = Lock()
+
+    def load(self, json_paths: list[Path], password: str) -> list[Account]:
+        """
+        Returns the accounts of the given keystores, decrypting in parallel
+        only the keystores that are not unlocked yet.
+        Args:
+            json_paths (list[Path]): The paths of the account JSON files
+            password (str): The wallets password
+        Returns:
+            list[Account]: The accounts, in the order of the given paths
+        """
+        paths = [Path(json_path).resolve() for json_path in json_paths]
+        with self._lock:
+            missing = list(dict.fromkeys(
+                path for path in paths if path not in self._accounts))
+            if len(missing) > 1 and WORKERS > 1:
+                with ProcessPoolExecutor(max_workers=WORKERS) as executor:
+                    secret_keys = list(executor.map(
+                        decrypt_secret_key, missing,
+                        [password] * len(missing)))
+            else:
+                secret_keys = [decrypt_secret_key(path, password)
+                               for path in missing]
+
+            for path, secret_key in zip(missing, secret_keys):
+                self._accounts[path] = Account(path, UserSecretKey(secret_key))
+
+            return [self._accounts[path] for path in paths]
+
+    def clear(self):
+        """
+        Forgets all the unlocked accounts.
+        """
+        with self._lock:
+            self._accounts.clear()
+
+
+# Process-wide keyring reused by all the steps of a pipeline run
+KEYRING = Keyring()
+
+
+def read_accounts_password():
+    """
+    Reads and returns the password for wallet accounts from the password file.
+    Returns:
+        str: The password string with whitespace trimmed
+    """
+    with open(PASSFILE_PATH, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def get_account_files():
+    """
+    Retrieves a list of account JSON files from the accounts directory.
+    Returns:
+        list: A list of paths to account JSON files
+    """
+    return sorted(ACC_JSON_PATH.glob("*.json"))
+
+
+def decrypt_secret_key(json_path: Path, password: str):
+    """
+    Decrypts a keystore file.
+    Runs inside a worker process when accounts are loaded in parallel.
+    Args:
+        json_path (Path): The path of the account JSON file
+        password (str): The wallets password
+    Returns:
+        bytes: The raw secret key
+    """
+    return UserWallet.load_secret_key(json_path, password).buffer
+
+
+def load_accounts(json_paths: list[Path] | None = None,
+                  password: str | None = None):
+    """
+    Loads the accounts of the given keystores through the process-wide keyring.
+    Args:
+        json_paths (list[Path]): The paths of the account JSON files,
+        all the files in the accounts directory by default
+        password (str): The wallets password, read from the password file
+        by default
+    Returns:
+        list[Account]: The unlocked accounts
+    """
+    if json_paths is None:
+        json_paths = get_account_files()
+    if password is None:
+        password = read_accounts_password()
+    return KEYRING.load(json_paths, password)
@@ -0,0 +1,140 @@
+"""
+Batched signing, sending and tracking of transactions.
+The transactions of an account are signed on nonces reserved locally, so they
+can all be sent at once. They are sent in batches, the rejected ones are signed
+again on the released nonces and resent, and the accepted ones are handed to
+the tracker.
+"""
+from collections.abc import Callable
+from functools import partial
+
+from multiversx_sdk import Address, Transaction, TransactionComputer
+
+from common.accounts import Account
+from common.nonces import get_nonce_manager
+from common.tracker import TransactionTracker
+
+MAX_RESENDS = 10  # Number of times the rejected transactions of a batch are resent
+
+
+def sign_transactions(account: Account, count: int,
+                      build_transaction: Callable[[Address], Transaction], proxy):
+    """
+    Creates and signs transactions of an account, pipelined on nonces
+    reserved locally. The nonces are released if a transaction can't be built.
+    Args:
+        account (Account): The sender account
+        count (int): The number of transactions
+        build_transaction: Builds the payload of a transaction from the sender address
+        proxy: The network provider used to fetch the account nonce
+    Returns:
+        list[Transaction]: The signed transactions
+    """
+    nonce_manager = get_nonce_manager(account.address, proxy)
+    nonces = nonce_manager.reserve(count)
+    transactions = []
+    try:
+        for nonce in nonces:
+            tx = build_transaction(account.address)
+            sign_transaction(account, tx, nonce)
+            transactions.append(tx)
+    except Exception:
+        nonce_manager.release(nonces)
+        raise
+    return transactions
+
+
+def sign_transaction(account: Account, transaction: Transaction, nonce: int):
+    """
+    Signs a transaction of an account on the given nonce.
+    Args:
+        account (Account): The sender account
+        transaction (Transaction): The transaction, signed in place
+        nonce (int): The nonce of the transaction
+    """
+    transaction.nonce = nonce
+    bytes_to_sign = TransactionComputer().compute_bytes_for_signing(transaction)
+    transaction.signature = account.signer.sign(bytes_to_sign)
+
+
+def resign_rejected(transactions: list[Transaction], accounts: dict[str, Account], proxy):
+    """
+    Signs the rejected transactions again on refilled nonces. Their nonces
+    are released and reserved again once the sync has dropped the ones
+    already passed by the network nonce, so the higher nonces of the
+    same senders are not left waiting behind a gap.
+    Args:
+        transactions (list[Transaction]): The rejected transactions
+        accounts (dict[str, Account]): The sender accounts by bech32 address
+        proxy: The network provider used to fetch the account nonces
+    """
+    by_sender: dict[str, list[Transaction]] = {}
+    for tx in transactions:
+        by_sender.setdefault(tx.sender, []).append(tx)
+    for sender, sender_transactions in by_sender.items():
+        nonce_manager = get_nonce_manager(Address.new_from_bech32(sender), proxy)
+        nonce_manager.release([tx.nonce for tx in sender_transactions])
+        nonce_manager.sync()
+        nonces = nonce_manager.reserve(len(sender_transactions))
+        for tx, nonce in zip(sender_transactions, nonces):
+            sign_transaction(accounts[sender], tx, nonce)
+
+
+def send_and_track(transactions: list[Transaction], accounts: list[Account], proxy,
+                   tracker: TransactionTracker, batch_size: int, on_result: Callable,
+                   label: str, on_rejected: Callable[[str], None] | None = None):
+    """
+    Sends transactions in batches and tracks the accepted ones.
+    The rejected transactions are signed again on refilled nonces and
+    resent, up to MAX_RESENDS times, then their nonces are released.
+    Args:
+        transactions (list[Transaction]): The signed transactions
+        accounts (list[Account]): The sender accounts, used to sign the
+        rejected transactions again
+        proxy: The network provider the batches are sent to
+        tracker (TransactionTracker): The tracker of the transactions
+        batch_size (int): The number of transactions in each send request
+        on_result: Called with the hash, the bech32 sender address and
+        the tracker future of each accepted transaction once it is resolved
+        label (str): The kind of transactions, for the messages
+        on_rejected: Optional function called with the bech32 sender address
+        of each transaction still rejected after the last resend
+    Returns:
+        list[Future]: The tracker futures of the accepted transactions
+    """
+    accounts_by_address = {account.address.to_bech32(): account for account in accounts}
+    futures = []
+    for start in range(0, len(transactions), batch_size):
+        batch = transactions[start:start + batch_size]
+        for resends in range(MAX_RESENDS + 1):
+            print(f"Sending {len(batch)} {label} transactions...")
+            try:
+                _, sent_hashes = proxy.send_transactions(batch)
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                sent_hashes = {}
+
+            # The gateway returns the hashes of the accepted transactions,
+            # keyed by their index in the batch
+            sent_hashes = sent_hashes or {}
+            rejected = []
+            for index, tx in enumerate(batch):
+                tx_hash = sent_hashes.get(str(index))
+                if tx_hash is None:
+                    print(f"{label.capitalize()} transaction of {tx.sender} "
+                          f"with nonce {tx.nonce} rejected")
+                    rejected.append(tx)
+                    continue
+                futures.append(tracker.track(tx_hash, partial(on_result, tx_hash, tx.sender)))
+            if not rejected or resends == MAX_RESENDS:
+                break
+
+            print(f"{len(rejected)} {label} transactions rejected, resending...")
+            resign_rejected(rejected, accounts_by_address, proxy)
+            batch = rejected
+
+        for tx in rejected:
+            get_nonce_manager(Address.new_from_bech32(tx.sender), proxy).release([tx.nonce])
+            if on_rejected is not None:
+                on_rejected(tx.sender)
+    return futures
@@ -0,0 +1,242 @@
+"""
+Persistent per-sender nonce management.
+Nonces are reserved locally, so several batches of a sender can be in flight
+without fetching the account from the gateway for each batch. The local state
+is reconciled with the network nonce periodically, and nonces lost by dropped
+or never sent transactions are detected and handed out again.
+"""
+from pathlib import Path
+from threading import Lock
+import json
+import os
+import time
+
+from multiversx_sdk import Address
+
+ROOT_PATH = Path(__file__).parent.parent
+NONCES_PATH = ROOT_PATH / "_nonces"
+SYNC_INTERVAL = 30  # Seconds between reconciliations with the network nonce
+# Seconds without the network nonce advancing after which the transaction
+# blocking it is considered dropped from the mempool and its nonce is reused
+STALE_AFTER = 120
+
+
+class NonceManager:
+    """
+    Reserves nonces for a sender and keeps track of the ones in flight.
+    The state is saved in _nonces/{address}.json after every change.
+    """
+
+    def __init__(self, address: Address, proxy, state_file: Path | None = None):
+        self.address = address
+        self.proxy = proxy
+        self.state_file = state_file or NONCES_PATH / f"{address.to_bech32()}.json"
+        self.next_nonce = 0
+        self.pending: dict[int, float] = {}  # nonce -> reservation time
+        self.free: set[int] = set()  # nonces to be handed out again
+        self.last_sync = 0.0
+        # Latest network nonce seen and when it last advanced, not saved, so
+        # the time a run was stopped never counts towards staleness
+        self.network_nonce: int | None = None
+        self.advanced_at = 0.0
+        self._lock = Lock()
+        self._load()
+
+    def _load(self):
+        if not self.state_file.exists():
+            return
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.next_nonce = state.get("next_nonce", 0)
+        self.pending = {int(nonce): reserved_at
+                        for nonce, reserved_at in state.get("pending", {}).items()}
+        self.free = set(state.get("free", []))
+
+    def _save(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        state = {
+            "next_nonce": self.next_nonce,
+            "pending": {str(nonce): reserved_at
+                        for nonce, reserved_at in sorted(self.pending.items())},
+            "free": sorted(self.free)
+        }
+        temp_file = self.state_file.with_suffix(".tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=4)
+        os.replace(temp_file, self.state_file)
+
+    def reconcile(self, network_nonce: int, in_flight: set[int] = frozenset()):
+        """
+        Reconciles the local state with the nonce of the account on the network.
+        Nonces below the network nonce are forgotten. Nonces between the
+        network nonce and the next local nonce that are not tracked are gaps
+        to be refilled, and so is the nonce blocking the account when the
+        network nonce has not advanced for longer than STALE_AFTER.
+        Args:
+            network_nonce (int): The current nonce of the account on the network
+            in_flight (set[int]): The nonces of the transactions the caller knows
+            may still be executed, kept pending and never refilled
+        """
+        with self._lock:
+            self._reconcile(network_nonce, in_flight)
+            self._save()
+
+    def _reconcile(self, network_nonce: int, in_flight: set[int]):
+        now = time.time()
+        if self.network_nonce is None or network_nonce > self.network_nonce:
+            self.network_nonce = network_nonce
+            self.advanced_at = now
+
+        self.pending = {nonce: reserved_at
+                        for nonce, reserved_at in self.pending.items()
+                        if nonce >= network_nonce}
+        self.free = {nonce for nonce in self.free if nonce >= network_nonce}
+        if network_nonce > self.next_nonce:
+            # The account sent transactions we don't know about
+            self.next_nonce = network_nonce
+        # Transactions in flight keep their nonces, even ones the state lost
+        for nonce in in_flight:
+            if nonce >= network_nonce:
+                self.pending.setdefault(nonce, now)
+                self.free.discard(nonce)
+                self.next_nonce = max(self.next_nonce, nonce + 1)
+
+        for nonce in range(network_nonce, self.next_nonce):
+            if nonce not in self.pending and nonce not in self.free:
+                print(f"Nonce gap detected for {self.address.to_bech32()}: {nonce}")
+                self.free.add(nonce)
+
+        # Only the lowest pending nonce blocks the account. Transactions with
+        # higher nonces may just wait behind it, so they are never refilled;
+        # if the network nonce is stuck on it for too long, its transaction
+        # was dropped and the nonce is refilled
+        if (network_nonce in self.pending and network_nonce not in in_flight
+                and now - self.advanced_at > STALE_AFTER):
+            print(f"Nonce {network_nonce} of {self.address.to_bech32()} is stale, refilling it")
+            del self.pending[network_nonce]
+            self.free.add(network_nonce)
+            # The refilled nonce gets a full STALE_AFTER to be executed
+            self.advanced_at = now
+
+        self.last_sync = now
+
+    def sync(self, in_flight: set[int] = frozenset()):
+        """
+        Fetches the account nonce from the network and reconciles with it.
+        Args:
+            in_flight (set[int]): The nonces of the transactions known to be
+            in flight, kept pending and never refilled
+        Returns:
+            int: The network nonce
+        """
+        account_on_network = self.proxy.get_account(self.address)
+        self.reconcile(account_on_network.nonce, in_flight)
+        return account_on_network.nonce
+
+    def reserve(self, count: int = 1):
+        """
+        Reserves nonces for new transactions. Gaps are refilled first,
+        so the returned nonces are not necessarily consecutive.
+        The network nonce is fetched only once every SYNC_INTERVAL seconds.
+        Args:
+            count (int): The number of nonces to reserve
+        Returns:
+            list[int]: The reserved nonces in ascending order
+        """
+        if time.time() - self.last_sync > SYNC_INTERVAL:
+            self.sync()
+
+        with self._lock:
+            nonces = sorted(self.free)[:count]
+            self.free.difference_update(nonces)
+            while len(nonces) < count:
+                nonces.append(self.next_nonce)
+                self.next_nonce += 1
+
+            now = time.time()
+            for nonce in nonces:
+                self.pending[nonce] = now
+            self._save()
+        return nonces
+
+    def reserve_gaps(self, in_flight: set[int] = frozenset()):
+        """
+        Reconciles with the network nonce right away and reserves all the
+        gaps below the next local nonce, so they can be filled without
+        waiting for new transactions to be reserved.
+        Args:
+            in_flight (set[int]): The nonces of the transactions known to be
+            in flight, never reserved as gaps
+        Returns:
+            list[int]: The reserved gap nonces in ascending order
+        """
+        self.sync(in_flight)
+        with self._lock:
+            nonces = sorted(nonce for nonce in self.free if nonce < self.next_nonce)
+            self.free.difference_update(nonces)
+            now = time.time()
+            for nonce in nonces:
+                self.pending[nonce] = now
+            self._save()
+        return nonces
+
+    def release_untracked(self, in_flight: set[int]):
+        """
+        Reconciles with the network nonce right away and releases the pending
+        nonces that are not in flight, such as the nonces reserved by a run
+        that stopped before recording them. The nonces in flight stay pending.
+        Args:
+            in_flight (set[int]): The nonces of the transactions known to be in flight
+        Returns:
+            list[int]: The released nonces
+        """
+        self.sync(in_flight)
+        with self._lock:
+            nonces = sorted(nonce for nonce in self.pending if nonce not in in_flight)
+            for nonce in nonces:
+                del self.pending[nonce]
+            self.free.update(nonces)
+            self._save()
+        return nonces
+
+    def release(self, nonces: list[int]):
+        """
+        Hands back nonces of transactions that were never accepted,
+        so they are reused by the next reservations.
+        Args:
+            nonces (list[int]): The nonces to release
+        """
+        with self._lock:
+            for nonce in nonces:
+                if self.pending.pop(nonce, None) is not None:
+                    self.free.add(nonce)
+            self._save()
+
+    def get_nonce_then_increment(self):
+        """
+        Reserves a single nonce, like AccountNonceHolder.
+        Returns:
+            int: The reserved nonce
+        """
+        return self.reserve(1)[0]
+
+
+_managers: dict[str, NonceManager] = {}
+_managers_lock = Lock()
+
+
+def get_nonce_manager(address: Address, proxy):
+    """
+    Returns the nonce manager of a sender, shared by all callers in the process.
+    Args:
+        address (Address): The sender address
+        proxy: The network provider used to fetch the account nonce
+    Returns:
+        NonceManager: The nonce manager of the sender
+    """
+    with _managers_lock:
+        manager = _managers.get(address.to_bech32())
+        if manager is None:
+            manager = NonceManager(address, proxy)
+            _managers[address.to_bech32()] = manager
+        return manager
@@ -0,0 +1,143 @@
+"""
+Adaptive submission of transaction batches to the gateway.
+The batch size and the delay between batches are adjusted with AIMD
+(additive increase, multiplicative decrease) from the observed request
+latency and from the error and throttle responses of the gateway.
+"""
+from threading import BoundedSemaphore, Lock
+import time
+
+# Default limits, the scripts can override them
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 250
+BATCH_SIZE_STEP = 10  # Additive increase of the batch size after a fast request
+TARGET_LATENCY = 2.0  # Seconds, slower requests shrink the batch size
+MIN_BACKOFF = 0.5  # Seconds, first delay after an error
+MAX_DELAY = 10.0  # Seconds, ceiling of the delay between batches
+
+
+def is_throttled(error: Exception):
+    """
+    Checks if a gateway error is a rate limiting response.
+    Args:
+        error (Exception): The error raised by the network provider
+    Returns:
+        bool: True if the gateway throttled the request
+    """
+    message = str(error).lower()
+    return "429" in message or "too many requests" in message
+
+
+class AdaptiveSubmitter:
+    """
+    Sends transaction batches while adapting the batch size and the delay
+    between batches. Shared by all the senders using the same gateway.
+    """
+
+    def __init__(self,
+                 initial_batch_size: int,
+                 min_batch_size: int = MIN_BATCH_SIZE,
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 target_latency: float = TARGET_LATENCY,
+                 max_delay: float = MAX_DELAY,
+                 semaphore: BoundedSemaphore | None = None):
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_delay = max_delay
+        self.semaphore = semaphore
+        self.batch_size = max(min_batch_size, min(initial_batch_size, max_batch_size))
+        self.delay = 0.0
+        self.sent = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.first_send = None
+        self.last_send = None
+        self._next_send = 0.0
+        self._lock = Lock()
+
+    def get_batch_size(self):
+        """
+        Returns the current batch size.
+        Returns:
+            int: The number of transactions to put in the next batch
+        """
+        with self._lock:
+            return self.batch_size
+
+    def _pace(self):
+        # Spaces the requests of all the senders by the current delay
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_send)
+            self._next_send = send_at + self.delay
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def send(self, proxy, transactions: list):
+        """
+        Sends a batch of transactions and adapts to the gateway response.
+        Args:
+            proxy: The network provider
+            transactions (list): The signed transactions
+        Returns:
+            tuple: (number of sent transactions, hashes keyed by batch index)
+        Raises:
+            Exception: The error of the network provider
+        """
+        self._pace()
+        if self.semaphore is not None:
+            self.semaphore.acquire()
+        start_time = time.monotonic()
+        try:
+            num_sent, hashes = proxy.send_transactions(transactions)
+        except Exception as e:
+            self._on_error(e)
+            raise
+        finally:
+            if self.semaphore is not None:
+                self.semaphore.release()
+        self._on_success(len(hashes or {}), time.monotonic() - start_time)
+        return num_sent, hashes
+
+    def _on_success(self, accepted: int, latency: float):
+        with self._lock:
+            now = time.monotonic()
+            self.first_send = self.first_send or now - latency
+            self.last_send = now
+            self.sent += accepted
+            self.requests += 1
+            if latency <= self.target_latency:
+                self.batch_size = min(self.max_batch_size, self.batch_size + BATCH_SIZE_STEP)
+                self.delay = self.delay / 2 if self.delay > MIN_BACKOFF / 8 else 0.0
+            else:
+                self.batch_size = max(self.min_batch_size, self.batch_size * 3 // 4)
+
+    def _on_error(self, error: Exception):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            if is_throttled(error):
+                self.throttled += 1
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self.delay = min(self.max_delay, max(self.delay * 2, MIN_BACKOFF))
+
+    def get_rate(self):
+        """
+        Returns the sustained rate of accepted transactions.
+        Returns:
+            float: Accepted transactions per second
+        """
+        with self._lock:
+            if self.first_send is None or self.last_send <= self.first_send:
+                return 0.0
+            return self.sent / (self.last_send - self.first_send)
+
+    def report(self):
+        """
+        Prints the submission statistics.
+        """
+        print(f"Sustained rate: {self.get_rate():.1f} tx/s over {self.requests} requests "
+              f"({self.errors} errors, {self.throttled} throttled)")
+        print(f"Final batch size: {self.batch_size}, delay between batches: {self.delay:.2f}s")
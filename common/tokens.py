@@ -0,0 +1,113 @@
+"""
+Registry of the issued tokens and their owners.
+A single SQLite index keyed by token ID and by owner replaces scanning the
+_tokens/*.token files. The existing token files are imported on first use.
+"""
+from pathlib import Path
+from threading import Lock
+import sqlite3
+import time
+
+ROOT_PATH = Path(__file__).parent.parent
+TOKEN_FILE_PATH = ROOT_PATH / "_tokens"
+REGISTRY_FILE = TOKEN_FILE_PATH / "registry.sqlite"
+
+
+class TokenRegistry:
+    """
+    SQLite index of the issued tokens, keyed by token ID and by owner.
+    """
+
+    def __init__(self, path: Path = REGISTRY_FILE, token_files_path: Path | None = None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.token_files_path = token_files_path or path.parent
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS tokens (
+                    token_id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    issued_at REAL NOT NULL
+                )""")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS tokens_owner ON tokens (owner)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+        self._migrate_token_files()
+
+    def _migrate_token_files(self):
+        # Imports the token files written before the registry existed
+        with self._lock:
+            migrated = self._connection.execute(
+                "SELECT value FROM metadata WHERE key = 'migrated'").fetchone()
+        if migrated:
+            return
+
+        rows = []
+        for token_file in self.token_files_path.glob("*.token"):
+            try:
+                with open(token_file, "r", encoding="utf-8") as f:
+                    # The token ID is the filename, the file contains the owner's address
+                    rows.append((token_file.stem, f.read().strip(), token_file.stat().st_mtime))
+            except Exception as e:
+                print(f"Error reading token file {token_file}: {str(e)}")
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO tokens VALUES (?, ?, ?)", rows)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('migrated', ?)", (str(time.time()),))
+        if rows:
+            print(f"Imported {len(rows)} token files into the token registry")
+
+    def add(self, token_id: str, owner: str):
+        """
+        Registers an issued token.
+        Args:
+            token_id (str): The token ID
+            owner (str): The bech32 address of the owner
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)",
+                (token_id, owner, time.time()))
+
+    def get_tokens(self, owner: str):
+        """
+        Returns the tokens of an owner.
+        Args:
+            owner (str): The bech32 address of the owner
+        Returns:
+            list[str]: The token IDs
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT token_id FROM tokens WHERE owner = ? ORDER BY token_id",
+                (owner,)).fetchall()
+        return [token_id for token_id, in rows]
+
+    def close(self):
+        """
+        Closes the registry database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+_registry: TokenRegistry | None = None
+_registry_lock = Lock()
+
+
+def get_token_registry():
+    """
+    Returns the token registry, shared by all callers in the process.
+    Returns:
+        TokenRegistry: The token registry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TokenRegistry()
+        return _registry
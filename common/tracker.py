@@ -0,0 +1,152 @@
+"""
+Concurrent tracking of transaction statuses.
+Many transaction hashes can be tracked at once; they are polled by a small
+worker pool with jittered exponential backoff, and each one resolves a future
+with the transaction on network when it is finalized.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from threading import Condition, Thread
+import heapq
+import itertools
+import random
+import time
+
+from multiversx_sdk.network_providers.transactions import TransactionOnNetwork
+
+TRACKER_WORKERS = 8  # Max number of concurrent status requests
+INITIAL_DELAY = 2.0  # Seconds before the first status request
+MAX_DELAY = 15.0  # Seconds, ceiling of the delay between status requests
+TRACK_TIMEOUT = 600.0  # Seconds after which a transaction is given up
+
+
+class _TrackedTransaction:
+    def __init__(self, tx_hash: str, future: Future, deadline: float):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.deadline = deadline
+        self.attempt = 0
+
+
+class TransactionTracker:
+    """
+    Polls the status of the tracked transactions until they are finalized.
+    """
+
+    def __init__(self, proxy, workers: int = TRACKER_WORKERS,
+                 initial_delay: float = INITIAL_DELAY, max_delay: float = MAX_DELAY,
+                 timeout: float = TRACK_TIMEOUT):
+        self.proxy = proxy
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._queue: list = []  # heap of (poll time, sequence, tracked transaction)
+        self._sequence = itertools.count()
+        self._condition = Condition()
+        self._closed = False
+        self._scheduler = Thread(target=self._run, daemon=True)
+        self._scheduler.start()
+
+    def track(self, tx_hash: str, callback=None):
+        """
+        Starts tracking a transaction.
+        Args:
+            tx_hash (str): The transaction hash
+            callback: Optional function called with the future once it is resolved
+        Returns:
+            Future: Resolves to the TransactionOnNetwork once finalized,
+            or raises TimeoutError
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        item = _TrackedTransaction(tx_hash, future, time.monotonic() + self.timeout)
+        self._schedule(item, self._jitter(self.initial_delay))
+        return future
+
+    def track_all(self, tx_hashes: list[str], callback=None):
+        """
+        Starts tracking a set of transactions.
+        Args:
+            tx_hashes (list[str]): The transaction hashes
+            callback: Optional function called with each future once it is resolved
+        Returns:
+            dict: Transaction hash mapped to its future
+        """
+        return {tx_hash: self.track(tx_hash, callback) for tx_hash in tx_hashes}
+
+    def wait_all(self, futures):
+        """
+        Waits until all the tracked transactions are resolved.
+        Args:
+            futures: The futures returned by track or track_all
+        Returns:
+            int: The number of transactions that could not be tracked
+        """
+        futures = list(futures.values()) if isinstance(futures, dict) else list(futures)
+        wait(futures)
+        return sum(1 for future in futures if future.exception() is not None)
+
+    def close(self):
+        """
+        Stops the tracker. Transactions still tracked are cancelled.
+        """
+        with self._condition:
+            self._closed = True
+            for _, _, item in self._queue:
+                item.future.cancel()
+            self._queue.clear()
+            self._condition.notify()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _jitter(self, delay: float):
+        return delay * random.uniform(0.5, 1.5)
+
+    def _schedule(self, item: _TrackedTransaction, delay: float):
+        with self._condition:
+            if self._closed:
+                item.future.cancel()
+                return
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._sequence), item))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._queue and self._queue[0][0] <= time.monotonic():
+                        break
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                _, _, item = heapq.heappop(self._queue)
+            self._executor.submit(self._poll, item)
+
+    def _poll(self, item: _TrackedTransaction):
+        if item.future.cancelled():
+            return
+        try:
+            status = self.proxy.get_transaction_status(item.tx_hash)
+            if status.is_executed():
+                tx_on_network: TransactionOnNetwork = self.proxy.get_transaction(item.tx_hash, True)
+                item.future.set_result(tx_on_network)
+                return
+        except Exception as e:
+            # The transaction may not be available yet, keep polling
+            if "not found" not in str(e).lower():
+                print(f"Error fetching transaction {item.tx_hash}: {str(e)}")
+
+        if time.monotonic() > item.deadline:
+            item.future.set_exception(TimeoutError(f"Transaction {item.tx_hash} was not finalized"))
+            return
+        item.attempt += 1
+        delay = min(self.max_delay, self.initial_delay * 2 ** item.attempt)
+        self._schedule(item, self._jitter(delay))
@@ -0,0 +1,131 @@
+"""
+Tests of the persistent nonce manager, against a fake network provider.
+"""
+from pathlib import Path
+import sys
+
+import pytest
+from multiversx_sdk import Address
+
+sys.path.append(str(Path(__file__).parent.parent))
+from common import nonces  # noqa: E402
+from common.nonces import STALE_AFTER, NonceManager  # noqa: E402
+
+ADDRESS = Address.new_from_bech32(
+    "erd1qyu5wthldzr8wx5c9ucg8kjagg0jfs53s8nr3zpz3hypefsdd8ssycr6th")
+
+
+class FakeAccount:
+    def __init__(self, nonce: int):
+        self.nonce = nonce
+
+
+class FakeProxy:
+    # Network provider returning a settable account nonce
+    def __init__(self, nonce: int = 0):
+        self.nonce = nonce
+
+    def get_account(self, address: Address):
+        return FakeAccount(self.nonce)
+
+
+class Clock:
+    # Replaces time.time, so staleness can be tested without waiting
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(nonces.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return tmp_path / "nonces.json"
+
+
+def test_waiting_nonces_are_not_refilled_while_the_network_nonce_advances(clock, state_file):
+    proxy = FakeProxy()
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    assert manager.reserve(10) == list(range(10))
+
+    # The transactions are executed slowly, the later ones wait much longer
+    # than STALE_AFTER in the mempool
+    for network_nonce in range(1, 10):
+        clock.now += STALE_AFTER / 2
+        proxy.nonce = network_nonce
+        manager.sync()
+        assert not manager.free
+
+
+def test_only_the_blocking_nonce_is_refilled(clock, state_file):
+    proxy = FakeProxy(3)
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    manager.next_nonce = 3
+    assert manager.reserve(5) == [3, 4, 5, 6, 7]
+
+    clock.now += STALE_AFTER + 1
+    manager.sync()
+    assert manager.free == {3}
+    assert sorted(manager.pending) == [4, 5, 6, 7]
+
+    # The refilled nonce gets a full STALE_AFTER to be executed
+    assert manager.reserve(1) == [3]
+    clock.now += STALE_AFTER / 2
+    manager.sync()
+    assert not manager.free
+
+
+def test_old_reservations_are_not_stale_after_a_restart(clock, state_file):
+    proxy = FakeProxy()
+    assert NonceManager(ADDRESS, proxy, state_file).reserve(5) == list(range(5))
+
+    # The run is restarted long after the nonces were reserved
+    clock.now += 10 * STALE_AFTER
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    manager.sync()
+    assert not manager.free
+    assert sorted(manager.pending) == list(range(5))
+
+
+def test_tracked_nonces_stay_pending_when_resuming_after_stale_after(clock, state_file):
+    proxy = FakeProxy()
+    assert NonceManager(ADDRESS, proxy, state_file).reserve(5) == list(range(5))
+
+    # The run is resumed once the journaled transactions waited longer than
+    # STALE_AFTER without being executed
+    clock.now += STALE_AFTER * 1.5
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    manager.sync()
+    clock.now += STALE_AFTER * 1.5
+    assert manager.release_untracked({0, 1, 2, 3, 4}) == []
+    assert not manager.free
+    assert manager.reserve_gaps({0, 1, 2, 3, 4}) == []
+    assert manager.reserve(3) == [5, 6, 7]
+
+
+def test_only_untracked_nonces_are_released(clock, state_file):
+    proxy = FakeProxy()
+    assert NonceManager(ADDRESS, proxy, state_file).reserve(5) == list(range(5))
+
+    # Nonces 3 and 4 were signed ahead by a run that stopped before journaling them
+    clock.now += STALE_AFTER * 2
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    assert manager.release_untracked({0, 1, 2}) == [3, 4]
+    assert sorted(manager.pending) == [0, 1, 2]
+    assert manager.reserve(3) == [3, 4, 5]
+
+
+def test_lost_in_flight_nonces_are_not_reused(clock, state_file):
+    # The state was lost, but the journal still has transactions in flight
+    proxy = FakeProxy(2)
+    manager = NonceManager(ADDRESS, proxy, state_file)
+    assert manager.release_untracked({2, 4}) == []
+    assert manager.reserve_gaps({2, 4}) == [3]
+    assert manager.reserve(1) == [5]